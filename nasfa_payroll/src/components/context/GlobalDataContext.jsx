@@ -61,7 +61,8 @@ export const GlobalDataProvider = ({ children }) => {
       (Number(salary.conafss) || 0) +
         (Number(salary.staffGrant) || 0) +
         (Number(salary.specialForcesAllowance) || 0) +
-        (Number(salary.packingAllowance) || 0)
+        (Number(salary.packingAllowance) || 0) +
+        (Number(salary.arrears) || 0)
     );
   };
 
@@ -73,7 +74,8 @@ export const GlobalDataProvider = ({ children }) => {
         (Number(deductions.nawisDeduction) || 0) +
         (Number(deductions.benevolent) || 0) +
         (Number(deductions.quarterRental) || 0) +
-        (Number(deductions.incomeTax) || 0)
+        (Number(deductions.incomeTax) || 0) +
+        (Number(deductions.scheduled) || 0)
     );
   };
 
@@ -106,8 +108,13 @@ export const GlobalDataProvider = ({ children }) => {
 
       const payrollsNormalized = rawPayrolls.map((p) => {
         const personnel = Array.isArray(p.personnel) ? p.personnel : [];
+        // Archived payrolls only keep per-line totals in the hot collection
         const totalAmount = personnel.reduce(
-          (sum, person) => sum + calculateNetPay(person),
+          (sum, person) =>
+            sum +
+            (person.salary
+              ? calculateNetPay(person)
+              : Number(person.netPay) || 0),
           0
         );
 
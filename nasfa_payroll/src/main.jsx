@@ -1,10 +1,19 @@
 import { StrictMode } from "react";
 import { createRoot } from "react-dom/client";
 import { BrowserRouter } from "react-router-dom";
+import axios from "axios";
 import "./index.css";
 import App from "./App.jsx";
 import { GlobalDataProvider } from "./components/context/GlobalDataContext.jsx";
 
+// Send the login token with every API call so the server can scope data
+// to the user's formation
+axios.interceptors.request.use((config) => {
+  const token = localStorage.getItem("token");
+  if (token) config.headers.Authorization = `Bearer ${token}`;
+  return config;
+});
+
 createRoot(document.getElementById("root")).render(
   <StrictMode>
     <BrowserRouter>
@@ -1,4 +1,5 @@
-import React, { useState } from "react";
+import React, { useState, useEffect } from "react";
+import axios from "axios";
 
 function DetailsModal({
   showDetails,
@@ -8,8 +9,30 @@ function DetailsModal({
   onClose,
 }) {
   const [activeTab, setActiveTab] = useState("info");
+  const [payHistory, setPayHistory] = useState(null);
+  const [historyLoading, setHistoryLoading] = useState(false);
   const isActive = showDetails.status === "active";
 
+  useEffect(() => {
+    if (activeTab !== "history" || payHistory || !showDetails._id) return;
+    const fetchPayHistory = async () => {
+      setHistoryLoading(true);
+      try {
+        const res = await axios.get(
+          `${import.meta.env.VITE_API_BASE_URL}/api/staff/${showDetails._id}/pay-history`,
+          { params: { months: 12 } }
+        );
+        setPayHistory(res.data);
+      } catch (err) {
+        console.error("Pay history fetch error:", err);
+        setPayHistory({ history: [], totals: {}, count: 0 });
+      } finally {
+        setHistoryLoading(false);
+      }
+    };
+    fetchPayHistory();
+  }, [activeTab, payHistory, showDetails._id]);
+
   // Calculate totals
   const salary = showDetails.salary || {};
   const deductions = showDetails.deductions || {};
@@ -131,6 +154,16 @@ function DetailsModal({
             >
               Summary
             </button>
+            <button
+              onClick={() => setActiveTab("history")}
+              className={`flex-1 px-4 py-3 font-medium text-sm transition-colors ${
+                activeTab === "history"
+                  ? "text-purple-600 border-b-2 border-purple-600 bg-purple-50"
+                  : "text-gray-500 hover:text-gray-700 hover:bg-gray-50"
+              }`}
+            >
+              History
+            </button>
           </div>
         </div>
 
@@ -152,6 +185,12 @@ function DetailsModal({
                   <span className="font-medium">{showDetails.unit}</span>
                 </div>
               )}
+              {showDetails.formation && (
+                <div className="flex justify-between border-b pb-2">
+                  <span className="text-gray-600">Formation:</span>
+                  <span className="font-medium">{showDetails.formation}</span>
+                </div>
+              )}
               {showDetails.corps && (
                 <div className="flex justify-between border-b pb-2">
                   <span className="text-gray-600">Corps:</span>
@@ -403,6 +442,60 @@ function DetailsModal({
               </div>
             </div>
           )}
+
+          {/* Pay History Tab */}
+          {activeTab === "history" && (
+            <div className="space-y-3">
+              <h4 className="font-semibold text-gray-800 mb-3">
+                Pay History (last 12 payrolls)
+              </h4>
+              {historyLoading || !payHistory ? (
+                <p className="text-gray-500 text-sm">Loading...</p>
+              ) : payHistory.history.length === 0 ? (
+                <p className="text-gray-500 text-sm">
+                  No approved payrolls include this personnel yet.
+                </p>
+              ) : (
+                <>
+                  <div className="bg-purple-50 rounded-lg p-4 space-y-3">
+                    {payHistory.history.map((entry) => (
+                      <div
+                        key={entry.payrollId}
+                        className="flex justify-between items-center border-b border-purple-100 pb-2"
+                      >
+                        <span className="text-gray-700">
+                          {entry.month} {entry.year}
+                        </span>
+                        <span className="font-semibold text-purple-700">
+                          {formatCurrency(entry.netPay)}
+                        </span>
+                      </div>
+                    ))}
+                  </div>
+                  <div className="bg-gray-50 rounded-lg p-4 text-sm">
+                    <div className="flex justify-between mb-1">
+                      <span className="text-gray-600">Total Earnings:</span>
+                      <span className="text-green-600 font-semibold">
+                        +{formatCurrency(payHistory.totals.totalEarnings || 0)}
+                      </span>
+                    </div>
+                    <div className="flex justify-between mb-2">
+                      <span className="text-gray-600">Total Deductions:</span>
+                      <span className="text-red-600 font-semibold">
+                        -{formatCurrency(payHistory.totals.totalDeductions || 0)}
+                      </span>
+                    </div>
+                    <div className="border-t-2 border-gray-300 pt-2 flex justify-between">
+                      <span className="font-bold text-gray-800">Net Paid:</span>
+                      <span className="font-bold text-blue-600">
+                        {formatCurrency(payHistory.totals.netPay || 0)}
+                      </span>
+                    </div>
+                  </div>
+                </>
+              )}
+            </div>
+          )}
         </div>
 
         {/* Action Buttons */}
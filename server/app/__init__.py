@@ -1,5 +1,6 @@
 
 import os
+import multiprocessing
 from flask import Flask
 from flask_pymongo import PyMongo
 from flask_jwt_extended import JWTManager
@@ -18,9 +19,16 @@ def create_app():
 
     flask_app.config['MONGO_URI'] = os.getenv('MONGO_URI')
     flask_app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
+    flask_app.config['ARCHIVE_DIR'] = os.getenv('ARCHIVE_DIR', os.path.join(flask_app.instance_path, 'archives'))
+    flask_app.config['ARCHIVE_AFTER_DAYS'] = int(os.getenv('ARCHIVE_AFTER_DAYS', 730))
+    flask_app.config['INTEGRITY_AUDIT_INTERVAL'] = int(os.getenv('INTEGRITY_AUDIT_INTERVAL', 0))
+    flask_app.config['INTEGRITY_AUDIT_BATCH'] = int(os.getenv('INTEGRITY_AUDIT_BATCH', 100))
 
     CORS(flask_app, origins=["*"])
 
+    from app.compression import init_compression
+    init_compression(flask_app)
+
     @flask_app.route('/')
     def home():
         return "Hello, world!"
@@ -34,10 +42,22 @@ def create_app():
     flask_app.register_blueprint(staff_routes, url_prefix="/api")
     from app.routes.payroll_routes import payroll_routes
     flask_app.register_blueprint(payroll_routes, url_prefix="/api")
+    from app.routes.deduction_routes import deduction_routes
+    flask_app.register_blueprint(deduction_routes, url_prefix="/api")
+    from app.routes.retro_routes import retro_routes
+    flask_app.register_blueprint(retro_routes, url_prefix="/api")
+
 
+    # Spawned worker processes (retro pool) re-import the entry module and
+    # so call create_app again; they only need the config, not the start-up
+    # work below. The process name is set before that re-import, whereas
+    # parent_process() is not yet.
+    if multiprocessing.current_process().name != "MainProcess":
+        return flask_app
+
+    from app.indexes import start_index_reconciliation
+    start_index_reconciliation(flask_app, lambda: mongo.db)
 
-    with flask_app.app_context():
-        mongo.db.soldiers.create_index("serviceNumber", unique=True)
     try:
         with flask_app.app_context():
             mongo.db.command('ping')
@@ -45,7 +65,19 @@ def create_app():
     except Exception as e:
         print(" Error connecting to MongoDB:", e)
 
+    try:
+        from app.search import staff_index
+        with flask_app.app_context():
+            print(f" Staff search index built ({staff_index.build(mongo.db)} personnel)")
+    except Exception as e:
+        print(" Error building staff search index:", e)
+
+    from app.cli import register_commands
+    register_commands(flask_app)
 
+    from app.integrity import start_audit_worker
+    if flask_app.config['INTEGRITY_AUDIT_INTERVAL'] > 0:
+        start_audit_worker(flask_app, lambda: mongo.db, flask_app.config['INTEGRITY_AUDIT_INTERVAL'])
 
     return flask_app
 
@@ -0,0 +1,234 @@
+import os
+import json
+import mmap
+import zlib
+import struct
+import hashlib
+import tempfile
+from datetime import datetime, timezone, timedelta
+from app.models.payroll_model import compute_line_totals
+
+# Archive file layout (one file per payroll year):
+#   MAGIC | column blocks ... | footer | footer length (8 bytes) | footer sha256 (32 bytes) | MAGIC
+# Each column block is one zlib-compressed JSON array holding a single field of
+# every personnel line in one payroll. The footer maps payroll id -> header,
+# row count and {column: offset, length, sha256}, so a read only touches the
+# columns it needs.
+MAGIC = b"PRARCH01"
+TRAILER = struct.Struct("<Q32s")
+SLIM_FIELDS = ("serviceNumber", "totalEarnings", "totalDeductions", "netPay")
+
+_footer_cache = {}
+
+
+class ArchiveError(Exception):
+    """Raised when an archive file is missing, truncated or fails its checksum"""
+
+
+def archive_file_name(year):
+    return f"payrolls-{int(year)}.pra"
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _read_footer(mm, path):
+    if len(mm) < len(MAGIC) * 2 + TRAILER.size or mm[:len(MAGIC)] != MAGIC or mm[-len(MAGIC):] != MAGIC:
+        raise ArchiveError(f"{path} is not a payroll archive")
+
+    trailer_start = len(mm) - len(MAGIC) - TRAILER.size
+    footer_length, footer_digest = TRAILER.unpack(mm[trailer_start:trailer_start + TRAILER.size])
+    footer_bytes = mm[trailer_start - footer_length:trailer_start]
+    if hashlib.sha256(footer_bytes).digest() != footer_digest:
+        raise ArchiveError(f"{path} footer checksum mismatch")
+    return json.loads(zlib.decompress(footer_bytes))
+
+
+def load_footer(path):
+    """
+    Parse an archive footer, cached per file until the file is replaced.
+    """
+    stat = os.stat(path)
+    cached = _footer_cache.get(path)
+    if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        return cached[1]
+
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        footer = _read_footer(mm, path)
+    _footer_cache[path] = ((stat.st_mtime_ns, stat.st_size), footer)
+    return footer
+
+
+def read_archived_personnel(archive_dir, file_name, payroll_id, fields=None):
+    """
+    Rebuild the personnel lines of one archived payroll through a memory
+    map, decompressing only the requested columns.
+    """
+    path = os.path.join(archive_dir, file_name)
+    if not os.path.exists(path):
+        raise ArchiveError(f"Archive file {file_name} not found")
+
+    entry = load_footer(path)["payrolls"].get(str(payroll_id))
+    if entry is None:
+        raise ArchiveError(f"Payroll {payroll_id} not found in {file_name}")
+
+    columns = entry["columns"]
+    if fields:
+        columns = {name: meta for name, meta in columns.items() if name in fields}
+
+    values = {}
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for name, meta in columns.items():
+            block = mm[meta["offset"]:meta["offset"] + meta["length"]]
+            if hashlib.sha256(block).hexdigest() != meta["sha256"]:
+                raise ArchiveError(f"Checksum mismatch in column {name} of payroll {payroll_id}")
+            values[name] = json.loads(zlib.decompress(block))
+
+    return [
+        {name: column[row] for name, column in values.items()}
+        for row in range(entry["rows"])
+    ]
+
+
+def iter_payroll_lines(db, payroll_id, archive_dir=None, archive_file=None, fields=None):
+    """
+    Stream the personnel lines of one stored payroll without loading the
+    whole document, from Mongo or, for archived payrolls, from disk.
+    """
+    if archive_file:
+        yield from read_archived_personnel(archive_dir, archive_file, payroll_id, fields)
+        return
+
+    pipeline = [
+        {"$match": {"_id": payroll_id}},
+        {"$unwind": "$personnel"},
+        {"$replaceRoot": {"newRoot": "$personnel"}},
+    ]
+    if fields:
+        pipeline.append({"$project": dict({"_id": 0}, **{field: 1 for field in fields})})
+    yield from db.payrolls.aggregate(pipeline, allowDiskUse=True)
+
+
+def _write_columns(out, personnel):
+    names = []
+    for line in personnel:
+        for name in line:
+            if name not in names:
+                names.append(name)
+
+    columns = {}
+    for name in names:
+        block = zlib.compress(
+            json.dumps([line.get(name) for line in personnel], default=_json_default).encode("utf-8"),
+            level=9,
+        )
+        columns[name] = {
+            "offset": out.tell(),
+            "length": len(block),
+            "sha256": hashlib.sha256(block).hexdigest(),
+        }
+        out.write(block)
+    return columns
+
+
+def write_year_archive(archive_dir, year, payrolls):
+    """
+    Merge payrolls into the archive file for `year`. Existing blocks are
+    copied as-is; the file is rebuilt in a temp file and swapped in
+    atomically. Returns the archived payroll ids.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    file_name = archive_file_name(year)
+    path = os.path.join(archive_dir, file_name)
+
+    fd, temp_path = tempfile.mkstemp(dir=archive_dir, suffix=".tmp")
+    archived_ids = []
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(MAGIC)
+            footer = {"version": 1, "year": int(year), "payrolls": {}}
+
+            for payroll in payrolls:
+                payroll_id = str(payroll["_id"])
+                personnel = payroll.get("personnel") or []
+                header = {k: v for k, v in payroll.items() if k not in ("_id", "personnel")}
+                footer["payrolls"][payroll_id] = {
+                    "header": json.loads(json.dumps(header, default=_json_default)),
+                    "rows": len(personnel),
+                    "columns": _write_columns(out, personnel),
+                }
+                archived_ids.append(payroll["_id"])
+
+            if os.path.exists(path):
+                with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    for payroll_id, entry in _read_footer(mm, path)["payrolls"].items():
+                        if payroll_id in footer["payrolls"]:
+                            continue
+                        for meta in entry["columns"].values():
+                            block = mm[meta["offset"]:meta["offset"] + meta["length"]]
+                            meta["offset"] = out.tell()
+                            out.write(block)
+                        footer["payrolls"][payroll_id] = entry
+
+            footer_bytes = zlib.compress(json.dumps(footer).encode("utf-8"), level=9)
+            out.write(footer_bytes)
+            out.write(TRAILER.pack(len(footer_bytes), hashlib.sha256(footer_bytes).digest()))
+            out.write(MAGIC)
+            out.flush()
+            os.fsync(out.fileno())
+
+        os.replace(temp_path, path)
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    _footer_cache.pop(path, None)
+    return file_name, archived_ids
+
+
+def slim_personnel(personnel):
+    """Keep only what the hot collection needs for per-soldier history"""
+    slim = []
+    for line in personnel:
+        totals = compute_line_totals(dict(line))
+        slim.append({field: totals.get(field) for field in SLIM_FIELDS})
+    return slim
+
+
+def archive_payrolls(db, archive_dir, older_than_days):
+    """
+    Move approved payrolls older than `older_than_days` into per-year archive
+    files and replace them in Mongo with stub headers. Payrolls are streamed
+    one year at a time.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=int(older_than_days))
+    query = {"status": "approved", "archived": {"$ne": True}, "approvedAt": {"$lt": cutoff}}
+
+    summary = {"archived": 0, "files": []}
+    for year in sorted(db.payrolls.distinct("year", query)):
+        year_query = dict(query, year=year)
+        file_name, archived_ids = write_year_archive(
+            archive_dir, year, db.payrolls.find(year_query)
+        )
+
+        now = datetime.now(timezone.utc)
+        for payroll in db.payrolls.find({"_id": {"$in": archived_ids}}, {"personnel": 1}):
+            personnel = payroll.get("personnel") or []
+            db.payrolls.update_one(
+                {"_id": payroll["_id"]},
+                {"$set": {
+                    "archived": True,
+                    "archiveFile": file_name,
+                    "archivedAt": now,
+                    "personnelCount": len(personnel),
+                    "personnel": slim_personnel(personnel),
+                }}
+            )
+
+        summary["archived"] += len(archived_ids)
+        summary["files"].append(file_name)
+    return summary
@@ -1,8 +1,9 @@
 from flask import Blueprint, request, jsonify
 import bcrypt
-from flask_jwt_extended import create_access_token
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity
 from datetime import datetime, timedelta
 from app import mongo
+from app.partitions import is_headquarters
 
 auth = Blueprint('auth', __name__)
 
@@ -40,6 +41,10 @@ def signup():
 
         hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt())
 
+        # The very first account bootstraps headquarters; everyone else waits
+        # for a headquarters user to assign their formation
+        headquarters = mongo.db.users.estimated_document_count() == 0
+
         user_data = {
             "fullName": full_name,
             "rank": rank,
@@ -47,6 +52,8 @@ def signup():
             "email": email,
             "password": hashed_password.decode('utf-8'),
             "profilePicture": profile_picture,  
+            "formation": None,
+            "headquarters": headquarters,
             "createdAt": datetime.utcnow()
         }
 
@@ -64,7 +71,9 @@ def signup():
                 "fullName": full_name,
                 "rank": rank,
                 "serviceNumber": service_number,
-                "profilePicture": profile_picture
+                "profilePicture": profile_picture,
+                "formation": None,
+                "headquarters": headquarters
             }
         }), 201
 
@@ -102,8 +111,43 @@ def login():
             "fullName": user.get("fullName"),
             "rank": user.get("rank"),
             "serviceNumber": user.get("serviceNumber"),
-            "profilePicture": user.get("profilePicture", "")  
+            "profilePicture": user.get("profilePicture", ""),
+            "formation": user.get("formation"),
+            "headquarters": is_headquarters(user)
+        }), 200
+
+    except Exception as e:
+        return jsonify({"msg": "Error during login", "error": str(e)}), 500
+
+
+# ---------------------- ASSIGN FORMATION ----------------------
+@auth.route('/users/<service_number>/formation', methods=['PUT'])
+@jwt_required()
+def assign_formation(service_number):
+    try:
+        caller = mongo.db.users.find_one({"serviceNumber": get_jwt_identity()})
+        if not caller or not is_headquarters(caller):
+            return jsonify({"error": "Only headquarters can assign formations"}), 403
+
+        data = request.get_json() or {}
+        headquarters = bool(data.get('headquarters'))
+        formation = None if headquarters else (data.get('formation') or None)
+        if not headquarters and not formation:
+            return jsonify({"error": "Provide a formation or headquarters: true"}), 400
+
+        result = mongo.db.users.update_one(
+            {"serviceNumber": service_number},
+            {"$set": {"formation": formation, "headquarters": headquarters}}
+        )
+        if result.matched_count == 0:
+            return jsonify({"error": "User not found"}), 404
+
+        return jsonify({
+            "msg": "Formation assigned successfully",
+            "serviceNumber": service_number,
+            "formation": formation,
+            "headquarters": headquarters
         }), 200
 
     except Exception as e:
-        return jsonify({"msg": "Error during login", "error": str(e)}), 500
\ No newline at end of file
+        return jsonify({"msg": "Error assigning formation", "error": str(e)}), 500
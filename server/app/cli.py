@@ -0,0 +1,69 @@
+import click
+from app import mongo
+from app.indexes import reconcile_indexes
+from app.integrity import audit_payrolls
+from app.query_checks import seed_database, check_queries
+
+
+def register_commands(flask_app):
+    """Attach the maintenance commands to `flask --app run ...`"""
+
+    @flask_app.cli.command("audit-payrolls")
+    @click.option("--limit", default=None, type=int, help="Payrolls to verify this run")
+    def audit_payrolls_command(limit):
+        """Verify sealed payrolls against their Merkle roots."""
+        summary = audit_payrolls(
+            mongo.db,
+            flask_app.config["ARCHIVE_DIR"],
+            limit or flask_app.config["INTEGRITY_AUDIT_BATCH"],
+        )
+        click.echo(
+            f"Verified {summary['verified']} payroll(s): "
+            f"{len(summary['mismatched'])} mismatched, {len(summary['missing'])} missing"
+        )
+        for result in summary["mismatched"]:
+            click.echo(f"  {result['payrollId']} {result['month']} {result['year']}: {result['status']}")
+        for payroll_id in summary["missing"]:
+            click.echo(f"  {payroll_id}: deleted without an audit record")
+
+    @flask_app.cli.command("reconcile-indexes")
+    @click.option("--drop-unlisted", is_flag=True, help="Drop indexes missing from the manifest")
+    def reconcile_indexes_command(drop_unlisted):
+        """Create or rebuild indexes to match the index manifest."""
+        report = reconcile_indexes(mongo.db, drop_unlisted=drop_unlisted)
+        for action in ("created", "rebuilt", "unlisted"):
+            for name in report[action]:
+                click.echo(f"  {action:<9} {name}")
+        for error in report["errors"]:
+            click.echo(f"  error     {error}", err=True)
+        if report["errors"]:
+            raise SystemExit(1)
+
+    @flask_app.cli.command("check-queries")
+    @click.option("--seed", default=0, type=int, help="Seed an empty database with this many personnel first")
+    @click.option("--max-ratio", default=10.0, type=float, help="Max documents examined per document returned")
+    def check_queries_command(seed, max_ratio):
+        """Explain every route query; fail on COLLSCAN or a high examined/returned ratio.
+
+        Run against a local database (MONGO_URI), never production.
+        """
+        if seed:
+            counts = seed_database(mongo.db, personnel=seed)
+            click.echo(f"Seeded {counts['soldiers']} soldiers and {counts['payrolls']} payrolls")
+
+        report = reconcile_indexes(mongo.db)
+        for error in report["errors"]:
+            click.echo(f"  index error: {error}", err=True)
+
+        failures = 0
+        for result in check_queries(mongo.db, max_ratio):
+            status = "FAIL" if result["problems"] else "ok"
+            failures += bool(result["problems"])
+            click.echo(
+                f"{status:<4} {result['route']:<45} {'+'.join(result['stages']):<28} "
+                f"examined={result['docsExamined']} returned={result['returned']} "
+                f"{'; '.join(result['problems'])}"
+            )
+        if failures or report["errors"]:
+            click.echo(f"{failures} route query(s) failed the plan check", err=True)
+            raise SystemExit(1)
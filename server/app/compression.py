@@ -0,0 +1,222 @@
+import zlib
+from flask import request, jsonify, Response
+
+# Brotli, zstandard and msgpack are optional; encodings whose library is
+# missing are simply never negotiated.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+COLUMNAR_MIMETYPE = "application/vnd.nasfa.columnar+json"
+MSGPACK_MIMETYPE = "application/x-msgpack"
+COMPRESSIBLE_TYPES = ("application/json", COLUMNAR_MIMETYPE, MSGPACK_MIMETYPE, "text/")
+
+
+# ------------------------------
+# 🗜️ CONTENT ENCODERS
+# ------------------------------
+class _GzipEncoder:
+    def __init__(self, level):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk):
+        return self._obj.compress(chunk)
+
+    def finish(self):
+        return self._obj.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, level):
+        self._obj = brotli.Compressor(quality=min(level, 11))
+
+    def compress(self, chunk):
+        return self._obj.process(chunk)
+
+    def finish(self):
+        return self._obj.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self, level):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk):
+        return self._obj.compress(chunk)
+
+    def finish(self):
+        return self._obj.flush()
+
+
+def available_encoders():
+    """Supported encodings in server preference order"""
+    encoders = {}
+    if zstandard is not None:
+        encoders["zstd"] = _ZstdEncoder
+    if brotli is not None:
+        encoders["br"] = _BrotliEncoder
+    encoders["gzip"] = _GzipEncoder
+    return encoders
+
+
+def negotiate_encoding(accept_encoding, encoders):
+    """
+    Pick the best encoding from an Accept-Encoding header, honouring q-values
+    and falling back to server preference on ties.
+    """
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name] = quality
+
+    best, best_quality = None, 0.0
+    for name in encoders:
+        quality = accepted.get(name, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def _stream(chunks, encoder):
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        data = encoder.compress(chunk)
+        if data:
+            yield data
+    yield encoder.finish()
+
+
+def init_compression(flask_app):
+    """
+    Compress responses according to Accept-Encoding. Buffered responses
+    under COMPRESS_MIN_SIZE are left alone; streamed responses are always
+    compressed chunk by chunk.
+    """
+    flask_app.config.setdefault("COMPRESS_MIN_SIZE", 1024)
+    flask_app.config.setdefault("COMPRESS_LEVEL", 6)
+    encoders = available_encoders()
+
+    @flask_app.after_request
+    def compress_response(response):
+        response.vary.add("Accept-Encoding")
+
+        if (
+            response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or response.direct_passthrough
+            or not (response.mimetype or "").startswith(COMPRESSIBLE_TYPES)
+        ):
+            return response
+
+        encoding = negotiate_encoding(request.headers.get("Accept-Encoding"), encoders)
+        if encoding is None:
+            return response
+
+        encoder = encoders[encoding](flask_app.config["COMPRESS_LEVEL"])
+
+        if response.is_streamed:
+            response.response = _stream(response.response, encoder)
+            response.headers.pop("Content-Length", None)
+        else:
+            body = response.get_data()
+            if len(body) < flask_app.config["COMPRESS_MIN_SIZE"]:
+                return response
+            response.set_data(encoder.compress(body) + encoder.finish())
+
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+# ------------------------------
+# 📦 COMPACT LIST REPRESENTATIONS
+# ------------------------------
+def _flatten(item, prefix=""):
+    """Yield (dotted key, leaf value) pairs; nested dicts become dotted keys"""
+    for key, value in item.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict) and value:
+            yield from _flatten(value, f"{name}.")
+        else:
+            yield name, value
+
+
+def to_columnar(items):
+    """
+    Emit keys once: {"columns": [...], "rows": [[...], ...]}. Nested dicts
+    such as salary and deductions are flattened into dotted columns
+    ("salary.conafss"), so clients rebuild them by splitting on ".".
+    """
+    columns = {}
+    flat_items = []
+    for item in items:
+        flat = dict(_flatten(item))
+        flat_items.append(flat)
+        for key in flat:
+            columns.setdefault(key, None)
+    return {
+        "columns": list(columns),
+        "rows": [[flat.get(key) for key in columns] for flat in flat_items],
+    }
+
+
+def requested_list_format():
+    """
+    "msgpack", "columnar" or "json", from ?format= or the Accept header
+    """
+    requested = request.args.get("format", "").lower()
+    if not requested:
+        accept = request.accept_mimetypes
+        if msgpack is not None and accept[MSGPACK_MIMETYPE] > accept["application/json"]:
+            requested = "msgpack"
+        elif accept[COLUMNAR_MIMETYPE] > accept["application/json"]:
+            requested = "columnar"
+    if requested == "msgpack" and msgpack is None:
+        requested = "columnar"
+    return requested if requested in ("msgpack", "columnar") else "json"
+
+
+def list_response(payload, list_key=None, status=200):
+    """
+    Return a list payload (or the list under `list_key` of a dict payload)
+    as plain JSON, or in the compact columnar/MessagePack form when the
+    client opts in.
+    """
+    list_format = requested_list_format()
+    if list_format == "json":
+        return jsonify(payload), status
+
+    if list_key is None:
+        payload = to_columnar(payload)
+    else:
+        payload = dict(payload, **{list_key: to_columnar(payload[list_key])})
+
+    if list_format == "msgpack":
+        body = msgpack.packb(payload, default=str, use_bin_type=True)
+        return Response(body, status=status, mimetype=MSGPACK_MIMETYPE)
+    response = jsonify(payload)
+    response.mimetype = COLUMNAR_MIMETYPE
+    return response, status
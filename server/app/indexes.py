@@ -0,0 +1,128 @@
+import threading
+from pymongo import ASCENDING, DESCENDING, IndexModel
+
+# ------------------------------
+# 📇 INDEX MANIFEST — every index the app relies on, per collection
+# ------------------------------
+# `formation` is the partition key: formation-scoped routes lead with it,
+# so these compounds double as shard-key candidates if the data is sharded.
+INDEX_MANIFEST = {
+    "soldiers": [
+        {"keys": [("serviceNumber", ASCENDING)], "unique": True},
+        {"keys": [("status", ASCENDING)]},
+        {"keys": [("formation", ASCENDING), ("status", ASCENDING)]},
+        {"keys": [("formation", ASCENDING), ("serviceNumber", ASCENDING)]},
+    ],
+    "payrolls": [
+        {"keys": [("month", ASCENDING), ("year", ASCENDING)]},
+        {"keys": [("year", ASCENDING), ("status", ASCENDING)]},
+        {"keys": [("formation", ASCENDING), ("year", ASCENDING), ("month", ASCENDING)]},
+        {"keys": [("formation", ASCENDING), ("year", ASCENDING), ("status", ASCENDING)]},
+        {"keys": [("status", ASCENDING), ("approvedAt", ASCENDING)]},
+        {"keys": [("personnel.serviceNumber", ASCENDING), ("createdAt", DESCENDING)]},
+        {"keys": [("integrity.verifiedAt", ASCENDING)]},
+    ],
+    "users": [
+        {"keys": [("email", ASCENDING)], "unique": True},
+        {"keys": [("serviceNumber", ASCENDING)], "unique": True},
+    ],
+    "deduction_plans": [
+        {"keys": [("createdAt", DESCENDING)]},
+        {"keys": [("serviceNumber", ASCENDING), ("createdAt", DESCENDING)]},
+        {"keys": [("status", ASCENDING), ("createdAt", DESCENDING)]},
+        {"keys": [("formation", ASCENDING), ("createdAt", DESCENDING)]},
+    ],
+    "deduction_installments": [
+        {"keys": [("period", ASCENDING), ("serviceNumber", ASCENDING)]},
+        {"keys": [("planId", ASCENDING)]},
+        {"keys": [("payrollId", ASCENDING)]},
+    ],
+    "arrears": [
+        {"keys": [("status", ASCENDING), ("serviceNumber", ASCENDING)]},
+        {"keys": [("payrollId", ASCENDING)]},
+    ],
+    "arrears_batches": [
+        {"keys": [("createdAt", DESCENDING)]},
+        {"keys": [("changeKey", ASCENDING), ("fromPeriod", ASCENDING)]},
+        {"keys": [("formation", ASCENDING), ("createdAt", DESCENDING)]},
+    ],
+    "payroll_audit_log": [
+        {"keys": [("payrollId", ASCENDING), ("action", ASCENDING)]},
+    ],
+    "integrity_alerts": [
+        {"keys": [("payrollId", ASCENDING), ("status", ASCENDING)]},
+    ],
+}
+
+INDEX_OPTIONS = ("unique", "sparse")
+
+
+def _key_spec(keys):
+    return tuple((field, int(direction)) for field, direction in keys)
+
+
+def reconcile_indexes(db, manifest=INDEX_MANIFEST, drop_unlisted=False):
+    """
+    Make each collection's indexes match the manifest. Missing indexes are
+    created, indexes whose options changed are rebuilt, and indexes not in
+    the manifest are reported (or dropped with drop_unlisted). Safe to run
+    repeatedly.
+    """
+    report = {"created": [], "rebuilt": [], "unlisted": [], "errors": []}
+
+    for collection_name, specs in manifest.items():
+        collection = db[collection_name]
+        existing = {
+            _key_spec(info["key"].items()): info
+            for info in collection.list_indexes()
+        }
+        wanted = set()
+
+        for spec in specs:
+            keys = _key_spec(spec["keys"])
+            wanted.add(keys)
+            options = {option: spec[option] for option in INDEX_OPTIONS if spec.get(option)}
+            current = existing.get(keys)
+
+            try:
+                if current is None:
+                    name = collection.create_indexes([IndexModel(spec["keys"], **options)])[0]
+                    report["created"].append(f"{collection_name}.{name}")
+                elif any(bool(current.get(option)) != bool(options.get(option)) for option in INDEX_OPTIONS):
+                    collection.drop_index(current["name"])
+                    name = collection.create_indexes([IndexModel(spec["keys"], **options)])[0]
+                    report["rebuilt"].append(f"{collection_name}.{name}")
+            except Exception as e:
+                report["errors"].append(f"{collection_name}.{keys}: {e}")
+
+        for keys, info in existing.items():
+            if keys == (("_id", 1),) or keys in wanted:
+                continue
+            if drop_unlisted:
+                collection.drop_index(info["name"])
+            report["unlisted"].append(f"{collection_name}.{info['name']}")
+
+    return report
+
+
+def start_index_reconciliation(flask_app, db_getter):
+    """
+    Reconcile indexes on a background thread so app boot never waits on
+    index builds.
+    """
+    def run():
+        try:
+            with flask_app.app_context():
+                report = reconcile_indexes(db_getter())
+            print(
+                f" Indexes reconciled: {len(report['created'])} created, "
+                f"{len(report['rebuilt'])} rebuilt, {len(report['unlisted'])} unlisted"
+            )
+            for error in report["errors"]:
+                print(" Index error:", error)
+        except Exception as e:
+            print(" Error reconciling indexes:", e)
+
+    thread = threading.Thread(target=run, name="index-reconciliation", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,248 @@
+import json
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from bson.binary import Binary
+from app.archive import iter_payroll_lines, ArchiveError
+
+ALGORITHM = "sha256-merkle-v1"
+HASH_SIZE = 32
+MISSING_SWEEP_STATE = "missing-sweep"
+
+
+# ------------------------------
+# 🔐 HASHING
+# ------------------------------
+def canonical_line_hash(line):
+    """
+    SHA-256 of a personnel line in canonical form: sorted keys, compact
+    separators, top-level nulls dropped (archives cannot tell a null from a
+    missing key).
+    """
+    canonical = {k: v for k, v in line.items() if v is not None}
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).digest()
+
+
+def build_levels(leaves):
+    """
+    Build every Merkle level from the leaves up. An odd node at the end of a
+    level is promoted unchanged, so node i always has children 2i and 2i+1.
+    """
+    levels = [list(leaves) or [hashlib.sha256(b"").digest()]]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = [
+            hashlib.sha256(level[i] + level[i + 1]).digest()
+            for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            parents.append(level[-1])
+        levels.append(parents)
+    return levels
+
+
+def pack_levels(levels):
+    return [Binary(b"".join(level)) for level in levels]
+
+
+def unpack_levels(packed):
+    return [
+        [bytes(level[i:i + HASH_SIZE]) for i in range(0, len(level), HASH_SIZE)]
+        for level in packed
+    ]
+
+
+def seal_personnel(personnel):
+    """
+    Hash a payroll's lines and return (header integrity block, packed tree)
+    """
+    levels = build_levels(canonical_line_hash(line) for line in personnel)
+    header = {
+        "algorithm": ALGORITHM,
+        "root": levels[-1][0].hex(),
+        "leafCount": len(personnel),
+        "sealedAt": datetime.now(timezone.utc),
+        "verifiedAt": None,
+        "status": "sealed",
+    }
+    return header, pack_levels(levels)
+
+
+# ------------------------------
+# 🔎 VERIFICATION
+# ------------------------------
+def find_changed_leaves(stored, computed):
+    """
+    Walk both trees from the root and descend only into subtrees whose
+    hashes differ: O(k log n) comparisons for k changed lines.
+    """
+    if len(stored[0]) != len(computed[0]):
+        # Lines were added or removed, so the tree shapes differ
+        longest = max(len(stored[0]), len(computed[0]))
+        return [
+            i for i in range(longest)
+            if i >= len(stored[0]) or i >= len(computed[0]) or stored[0][i] != computed[0][i]
+        ]
+
+    changed = []
+    stack = [(len(stored) - 1, 0)]
+    while stack:
+        level, index = stack.pop()
+        if stored[level][index] == computed[level][index]:
+            continue
+        if level == 0:
+            changed.append(index)
+            continue
+        for child in (2 * index + 1, 2 * index):
+            if child < len(stored[level - 1]):
+                stack.append((level - 1, child))
+    return sorted(changed)
+
+
+def verify_payroll(db, archive_dir, payroll):
+    """
+    Recompute a payroll's Merkle root in one streaming pass over its lines
+    and compare it with the root sealed in payroll_integrity. The copy on
+    the payroll header is only a convenience: anyone able to edit the lines
+    could rewrite it too, so it must also match the sealed root.
+    """
+    integrity = payroll.get("integrity") or {}
+    result = {
+        "payrollId": str(payroll["_id"]),
+        "month": payroll.get("month"),
+        "year": payroll.get("year"),
+        "root": integrity.get("root"),
+    }
+    if not integrity.get("root"):
+        return dict(result, status="unsealed")
+
+    seal = db.payroll_integrity.find_one({"_id": payroll["_id"]}, {"root": 1})
+    if not seal:
+        return dict(result, status="mismatch", error="Sealed root is missing", changedLines=None)
+    result["root"] = seal["root"]
+    result["headerRoot"] = integrity["root"]
+
+    service_numbers = []
+    leaves = []
+    try:
+        for line in iter_payroll_lines(db, payroll["_id"], archive_dir, payroll.get("archiveFile")):
+            service_numbers.append(line.get("serviceNumber"))
+            leaves.append(canonical_line_hash(line))
+    except ArchiveError as e:
+        return dict(result, status="unreadable", error=str(e))
+
+    computed = build_levels(leaves)
+    result["computedRoot"] = computed[-1][0].hex()
+    result["leafCount"] = integrity.get("leafCount")
+    result["computedLeafCount"] = len(leaves)
+
+    if result["computedRoot"] == seal["root"]:
+        if integrity["root"] != seal["root"]:
+            return dict(result, status="mismatch", error="Header root was altered", changedLines=[])
+        return dict(result, status="ok", changedLines=[])
+
+    tree = db.payroll_integrity.find_one({"_id": payroll["_id"]}, {"levels": 1})
+    changed = find_changed_leaves(unpack_levels(tree["levels"]), computed)
+    return dict(result, status="mismatch", changedLines=[
+        {
+            "index": index,
+            "serviceNumber": service_numbers[index] if index < len(service_numbers) else None,
+        }
+        for index in changed
+    ])
+
+
+# ------------------------------
+# 🌙 INCREMENTAL AUDIT
+# ------------------------------
+def audit_payrolls(db, archive_dir, limit=100):
+    """
+    Verify the `limit` least recently verified sealed payrolls and flag
+    sealed payrolls that disappeared without a deletion record. The missing
+    sweep also checks `limit` seals per run, resuming from a cursor kept in
+    integrity_state and wrapping around once it reaches the end.
+    """
+    summary = {"verified": 0, "mismatched": [], "missing": []}
+    now = datetime.now(timezone.utc)
+
+    payrolls = db.payrolls.find(
+        {"integrity.root": {"$exists": True}},
+        {"personnel": 0},
+    ).sort("integrity.verifiedAt", 1).limit(int(limit))
+
+    for payroll in payrolls:
+        result = verify_payroll(db, archive_dir, payroll)
+        db.payrolls.update_one(
+            {"_id": payroll["_id"]},
+            {"$set": {"integrity.verifiedAt": now, "integrity.status": result["status"]}}
+        )
+        summary["verified"] += 1
+        if result["status"] != "ok":
+            summary["mismatched"].append(result)
+            db.integrity_alerts.update_one(
+                {
+                    "payrollId": result["payrollId"],
+                    "status": result["status"],
+                    "computedRoot": result.get("computedRoot"),
+                },
+                {"$set": dict(result, lastSeenAt=now), "$setOnInsert": {"detectedAt": now}},
+                upsert=True,
+            )
+
+    state = db.integrity_state.find_one({"_id": MISSING_SWEEP_STATE}) or {}
+    cursor = {"_id": {"$gt": state["lastId"]}} if state.get("lastId") else {}
+    batch = [
+        doc["_id"] for doc in
+        db.payroll_integrity.find(cursor, {"_id": 1}).sort("_id", 1).limit(int(limit))
+    ]
+
+    present = {doc["_id"] for doc in db.payrolls.find({"_id": {"$in": batch}}, {"_id": 1})}
+    deleted = {
+        doc["payrollId"] for doc in db.payroll_audit_log.find(
+            {"payrollId": {"$in": batch}, "action": "deleted"}, {"payrollId": 1}
+        )
+    }
+    for payroll_id in batch:
+        if payroll_id not in present and payroll_id not in deleted:
+            summary["missing"].append(str(payroll_id))
+            db.integrity_alerts.update_one(
+                {"payrollId": str(payroll_id), "status": "missing"},
+                {"$setOnInsert": {"detectedAt": now}},
+                upsert=True,
+            )
+
+    # A short batch means the sweep reached the end; start over next run
+    db.integrity_state.update_one(
+        {"_id": MISSING_SWEEP_STATE},
+        {"$set": {"lastId": batch[-1] if len(batch) == int(limit) else None, "updatedAt": now}},
+        upsert=True,
+    )
+    return summary
+
+
+def start_audit_worker(flask_app, db_getter, interval):
+    """
+    Run audit_payrolls every `interval` seconds on a daemon thread.
+    """
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                with flask_app.app_context():
+                    summary = audit_payrolls(
+                        db_getter(),
+                        flask_app.config["ARCHIVE_DIR"],
+                        flask_app.config["INTEGRITY_AUDIT_BATCH"],
+                    )
+                print(
+                    f" Integrity audit: {summary['verified']} verified, "
+                    f"{len(summary['mismatched'])} mismatched, {len(summary['missing'])} missing"
+                )
+            except Exception as e:
+                print(" Integrity audit failed:", e)
+
+    thread = threading.Thread(target=run, name="payroll-integrity-audit", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,41 @@
+from datetime import datetime, timezone
+
+DEDUCTION_TYPES = ("loan", "arrears", "installment")
+
+def deduction_plan_schema(data, installment_amount, start_period, end_period, formation=None):
+    """Schema for a per-soldier scheduled deduction plan"""
+    current_time = datetime.now(timezone.utc)
+    total_amount = float(data.get("totalAmount", 0))
+
+    return {
+        "serviceNumber": data.get("serviceNumber"),
+        "formation": formation,
+        "type": data.get("type", "installment"),
+        "description": data.get("description", ""),
+        "totalAmount": total_amount,
+        "installmentAmount": float(installment_amount),
+        "installments": int(data.get("installments", 1)),
+        "installmentsPaid": 0,
+        "balance": total_amount,
+        "startPeriod": start_period,
+        "endPeriod": end_period,
+        "status": "active",
+        "createdBy": data.get("createdBy", "Admin"),
+        "createdAt": current_time,
+        "updatedAt": current_time,
+    }
+
+def deduction_installment_item(plan, plan_id, period, amount):
+    """Single installment due for a plan in a given "YYYY-MM" period"""
+    return {
+        "planId": plan_id,
+        "serviceNumber": plan.get("serviceNumber"),
+        "formation": plan.get("formation"),
+        "period": period,
+        "type": plan.get("type"),
+        "description": plan.get("description"),
+        "amount": float(amount),
+        "status": "due",
+        "payrollId": None,
+        "appliedAt": None,
+    }
@@ -28,6 +28,7 @@ def payroll_personnel_item(soldier):
         "serviceNumber": soldier.get("serviceNumber"),
         "unit": soldier.get("unit"),
         "corps": soldier.get("corps"),
+        "formation": soldier.get("formation"),
         "bankName": soldier.get("bankName"),
         "accountNumber": soldier.get("accountNumber"),
         
@@ -39,4 +40,17 @@ def payroll_personnel_item(soldier):
         "netPay": soldier.get("netPay", 0),
         
         "status": soldier.get("status", "active")
-    }
\ No newline at end of file
+    }
+
+def compute_line_totals(item):
+    """Recompute earnings, deductions and net pay for a personnel item"""
+    salary = item.get("salary") or {}
+    deductions = item.get("deductions") or {}
+
+    total_earnings = sum(float(v or 0) for v in salary.values())
+    total_deductions = sum(float(v or 0) for v in deductions.values())
+
+    item["totalEarnings"] = round(total_earnings, 2)
+    item["totalDeductions"] = round(total_deductions, 2)
+    item["netPay"] = round(total_earnings - total_deductions, 2)
+    return item
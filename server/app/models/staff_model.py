@@ -11,6 +11,7 @@ def soldier_schema(data):
         "serviceNumber": data.get("serviceNumber"),
         "unit": data.get("unit"),
         "corps": data.get("corps"),
+        "formation": data.get("formation"),
         
         # Bank Details
         "bankName": data.get("bankName"),
@@ -0,0 +1,167 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from flask import g, request, jsonify
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+from app import mongo
+from app.models.payroll_model import payroll_personnel_item, compute_line_totals
+
+
+class FormationScopeError(Exception):
+    """Raised when a formation-scoped user touches another formation's data"""
+
+
+# ------------------------------
+# 🪖 FORMATION SCOPE
+# ------------------------------
+def is_headquarters(user):
+    """
+    Headquarters users act on every formation. Accounts created before
+    formations existed (neither field set) keep the full access they had.
+    """
+    return user.get("headquarters", "formation" not in user)
+
+
+def load_formation_scope():
+    """
+    before_request hook for the data blueprints: require a valid JWT and
+    load the caller's formation from their user record, so reassignment
+    takes effect immediately and nothing in the token can widen access.
+    """
+    if request.method == "OPTIONS":
+        return None
+    verify_jwt_in_request()
+
+    user = mongo.db.users.find_one(
+        {"serviceNumber": get_jwt_identity()}, {"formation": 1, "headquarters": 1}
+    )
+    if not user:
+        return jsonify({"error": "User not found"}), 401
+    if is_headquarters(user):
+        g.formation = None
+    elif user.get("formation"):
+        g.formation = user["formation"]
+    else:
+        return jsonify({"error": "Your account has not been assigned to a formation yet"}), 403
+    return None
+
+
+def current_formation():
+    """
+    The caller's formation, or None for headquarters users (full-force
+    access). Only valid behind load_formation_scope.
+    """
+    if "formation" not in g:
+        raise RuntimeError("Formation scope was not loaded for this request")
+    return g.formation
+
+
+def scoped(query=None, formation=None):
+    """
+    Restrict a soldiers/payrolls query to the caller's formation
+    """
+    query = dict(query or {})
+    formation = formation or current_formation()
+    if formation:
+        query["formation"] = formation
+    return query
+
+
+def resolve_formation(requested=None):
+    """
+    Formation a request acts on: the caller's own formation if scoped,
+    otherwise the one requested (None meaning the full force).
+    """
+    formation = current_formation()
+    if formation and requested and requested != formation:
+        raise FormationScopeError(f"Not permitted to act on formation {requested}")
+    return formation or requested or None
+
+
+def payroll_conflict_query(month, year, formation):
+    """
+    A formation run clashes with an existing run for itself or a full-force
+    run; a full-force run clashes with any run that month.
+    """
+    query = {"month": month, "year": year}
+    if formation:
+        query["formation"] = {"$in": [formation, None]}
+    return query
+
+
+def move_soldier_records(db, service_number, formation, session=None):
+    """
+    Re-tag a soldier's deduction plans, installments and arrears with the
+    formation they were moved to, so the new formation's scoped routes see
+    them and the old one's no longer do. Arrears of full-force batches
+    (formation None) are left as they are.
+    """
+    moved = {}
+    for collection in ("deduction_plans", "deduction_installments", "arrears"):
+        query = {"serviceNumber": service_number, "formation": {"$ne": formation}}
+        if collection == "arrears":
+            query["formation"] = {"$nin": [formation, None]}
+        result = db[collection].update_many(query, {"$set": {"formation": formation}}, session=session)
+        moved[collection] = result.modified_count
+    return moved
+
+
+# ------------------------------
+# ⚙️ PARALLEL PAYROLL RUN
+# ------------------------------
+def compute_partition(db, formation, period=None):
+    """
+    Build payroll lines for one formation's active personnel, joining its
+    pending arrears and, for a given period, its scheduled deductions.
+    """
+    # Imported here: the route modules import the scope helpers above
+    from app.routes.deduction_routes import fetch_due_installments, merge_scheduled_deductions
+    from app.routes.retro_routes import fetch_pending_arrears, merge_arrears
+
+    personnel = []
+    for soldier in db.soldiers.find({"formation": formation, "status": "active"}):
+        soldier["_id"] = str(soldier["_id"])
+        personnel.append(compute_line_totals(payroll_personnel_item(soldier)))
+
+    if period and personnel:
+        service_numbers = {item["serviceNumber"] for item in personnel}
+        merge_arrears(personnel, fetch_pending_arrears(service_numbers))
+        merge_scheduled_deductions(personnel, fetch_due_installments(period, service_numbers))
+
+    return {
+        "formation": formation,
+        "personnel": personnel,
+        "count": len(personnel),
+        "totalAmount": round(sum(float(item.get("netPay", 0)) for item in personnel), 2),
+    }
+
+
+def run_payroll(db, period=None, formation=None, max_workers=None):
+    """
+    Compute a payroll run partition by partition on a thread pool and merge
+    the results. A formation-scoped run computes just that partition.
+    """
+    if formation:
+        formations = [formation]
+    else:
+        # distinct() skips documents without the field, so always include
+        # the unpartitioned (legacy) slice
+        formations = db.soldiers.distinct("formation", {"status": "active"})
+        if None not in formations:
+            formations.append(None)
+
+    workers = max_workers or int(os.getenv("PAYROLL_WORKERS", min(32, (os.cpu_count() or 1) + 4)))
+    workers = max(1, min(workers, len(formations)))
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        partitions = list(pool.map(lambda f: compute_partition(db, f, period), formations))
+
+    personnel = [item for partition in partitions for item in partition["personnel"]]
+    return {
+        "personnel": personnel,
+        "count": len(personnel),
+        "totalAmount": round(sum(partition["totalAmount"] for partition in partitions), 2),
+        "partitions": [
+            {key: partition[key] for key in ("formation", "count", "totalAmount")}
+            for partition in partitions
+        ],
+    }
@@ -0,0 +1,268 @@
+from datetime import datetime, timezone, timedelta
+from itertools import combinations
+from bson.objectid import ObjectId
+from app.utils import MONTHS, period_key
+from app.partitions import payroll_conflict_query
+from app.retro import rate_change_key, payrolls_in_range_query
+from app.routes.staff_routes import pay_history_pipeline
+from app.routes.deduction_routes import deduction_schedule_query, due_installments_query
+from app.routes.payroll_routes import payroll_history_query
+from app.routes.retro_routes import pending_arrears_query, batch_overlap_query
+
+# ------------------------------
+# 🧪 ROUTE QUERY REGISTRY
+# ------------------------------
+# One entry per query shape a route issues: a find ("filter", optional
+# "sort"/"limit"), a "distinct" key, or an aggregate "pipeline". Filters
+# come from the same builders the routes call, so the registry follows
+# them when they change. Values point at the data created by
+# seed_database(), so the plans reflect a realistic selectivity.
+# "fullScan" marks deliberate unfiltered listings, where a COLLSCAN is
+# expected and only the examined/returned ratio is checked.
+SEED_SERVICE_NUMBER = "NA/SEED/000001"
+SEED_MONTH, SEED_YEAR = "March", 2024
+SEED_PERIOD = period_key(SEED_MONTH, SEED_YEAR)
+SEED_FORMATIONS = ("1 Div", "2 Div", "3 Div", "81 Div")
+SEED_FORMATION = SEED_FORMATIONS[0]
+SEED_RATE_CHANGE = {"component": "conafss", "delta": 2500}
+NO_ID = ObjectId("000000000000000000000000")
+
+
+def _shapes(route, collection, builder, optional, unfiltered=None, **query):
+    """
+    One entry per combination of a builder's optional arguments, from
+    none of them (the route's unfiltered default, plus any `unfiltered`
+    keys) to all of them
+    """
+    entries = []
+    for size in range(len(optional) + 1):
+        for names in combinations(optional, size):
+            label = f"{route} ({', '.join(names)})" if names else route
+            kwargs = {name: optional[name] for name in names}
+            entry = dict(query, route=label, collection=collection, filter=builder(**kwargs))
+            if not names:
+                entry.update(unfiltered or {})
+            entries.append(entry)
+    return entries
+
+
+ROUTE_QUERIES = [
+    {"route": "POST /api/add-staff", "collection": "soldiers",
+     "filter": {"serviceNumber": SEED_SERVICE_NUMBER}},
+    {"route": "GET /api/staff", "collection": "soldiers",
+     "filter": {}, "fullScan": True},
+    {"route": "GET /api/staff (formation)", "collection": "soldiers",
+     "filter": {"formation": SEED_FORMATION}},
+    {"route": "GET /api/payroll/active-personnel (formations)", "collection": "soldiers",
+     "distinct": "formation", "filter": {"status": "active"}},
+    {"route": "GET /api/payroll/active-personnel (per formation)", "collection": "soldiers",
+     "filter": {"formation": SEED_FORMATION, "status": "active"}},
+    {"route": "GET /api/staff/<id> (scoped)", "collection": "soldiers",
+     "filter": {"formation": SEED_FORMATION, "serviceNumber": SEED_SERVICE_NUMBER}},
+    {"route": "POST /auth/signup", "collection": "users",
+     "filter": {"email": "seed1@example.com"}},
+    {"route": "POST /auth/login", "collection": "users",
+     "filter": {"serviceNumber": SEED_SERVICE_NUMBER}},
+    {"route": "POST /api/payroll/approve", "collection": "payrolls",
+     "filter": payroll_conflict_query(SEED_MONTH, SEED_YEAR, None)},
+    {"route": "POST /api/payroll/approve (formation)", "collection": "payrolls",
+     "filter": payroll_conflict_query(SEED_MONTH, SEED_YEAR, SEED_FORMATION)},
+    # Unfiltered history reads the first `limit` payrolls in natural order
+    *_shapes(
+        "GET /api/payroll/history", "payrolls", payroll_history_query,
+        {"year": SEED_YEAR, "status": "approved", "formation": SEED_FORMATION},
+        unfiltered={"fullScan": True}, limit=50,
+    ),
+    {"route": "GET /api/staff/<id>/pay-history", "collection": "payrolls",
+     "pipeline": pay_history_pipeline([SEED_SERVICE_NUMBER], 12)},
+    {"route": "POST /api/payroll/retro", "collection": "payrolls",
+     "filter": payrolls_in_range_query(SEED_PERIOD, SEED_PERIOD)},
+    {"route": "POST /api/payroll/retro (formation)", "collection": "payrolls",
+     "filter": payrolls_in_range_query(SEED_PERIOD, SEED_PERIOD, SEED_FORMATION)},
+    {"route": "POST /api/payroll/retro (commit overlap)", "collection": "arrears_batches",
+     "filter": batch_overlap_query(rate_change_key(SEED_RATE_CHANGE), SEED_PERIOD, SEED_PERIOD)},
+    {"route": "POST /api/payroll/retro (commit overlap, formation)", "collection": "arrears_batches",
+     "filter": batch_overlap_query(rate_change_key(SEED_RATE_CHANGE), SEED_PERIOD, SEED_PERIOD, SEED_FORMATION)},
+    {"route": "POST /api/payroll/archive", "collection": "payrolls",
+     "filter": {"status": "approved", "archived": {"$ne": True},
+                "approvedAt": {"$lt": datetime(2024, 6, 1, tzinfo=timezone.utc)}}},
+    {"route": "flask audit-payrolls", "collection": "payrolls",
+     "filter": {"integrity.root": {"$exists": True}},
+     "sort": {"integrity.verifiedAt": 1}, "limit": 100},
+    {"route": "flask audit-payrolls (missing sweep)", "collection": "payroll_integrity",
+     "filter": {"_id": {"$gt": NO_ID}}, "sort": {"_id": 1}, "limit": 100},
+    *_shapes(
+        "GET /api/deductions/schedule", "deduction_plans", deduction_schedule_query,
+        {"service_number": SEED_SERVICE_NUMBER, "status": "active", "formation": SEED_FORMATION},
+        sort={"createdAt": -1},
+    ),
+    *_shapes(
+        "GET /api/deductions/due", "deduction_installments",
+        lambda **kwargs: due_installments_query(SEED_PERIOD, **kwargs),
+        {"formation": SEED_FORMATION},
+    ),
+    {"route": "POST /api/payroll/approve (installments)", "collection": "deduction_installments",
+     "filter": due_installments_query(SEED_PERIOD, [SEED_SERVICE_NUMBER])},
+    {"route": "POST /api/payroll/approve (arrears)", "collection": "arrears",
+     "filter": pending_arrears_query([SEED_SERVICE_NUMBER])},
+    {"route": "POST /api/payroll/approve (claimed installments)", "collection": "deduction_installments",
+     "filter": {"_id": {"$in": [NO_ID]}, "status": "applied", "payrollId": NO_ID}},
+    {"route": "DELETE /api/payroll/<id> (arrears)", "collection": "arrears",
+     "filter": {"payrollId": NO_ID, "status": "paid"}},
+    {"route": "DELETE /api/payroll/<id> (installments)", "collection": "deduction_installments",
+     "filter": {"payrollId": NO_ID, "status": "applied"}},
+    {"route": "GET /api/payroll/retro/batches", "collection": "arrears_batches",
+     "filter": {}, "sort": {"createdAt": -1}, "limit": 50},
+    {"route": "GET /api/payroll/retro/batches (formation)", "collection": "arrears_batches",
+     "filter": {"formation": SEED_FORMATION}, "sort": {"createdAt": -1}, "limit": 50},
+]
+
+
+# ------------------------------
+# 🌱 SEED DATA
+# ------------------------------
+def seed_database(db, personnel=200, months=24):
+    """
+    Fill an empty local database with synthetic soldiers, users, payrolls,
+    deduction schedules and arrears. Refuses to touch a database that
+    already has soldiers or payrolls.
+    """
+    if db.soldiers.estimated_document_count() or db.payrolls.estimated_document_count():
+        raise RuntimeError("Refusing to seed: database already contains soldiers or payrolls")
+
+    now = datetime.now(timezone.utc)
+    soldiers = [
+        {
+            "firstName": f"Seed{i}",
+            "lastName": f"Soldier{i}",
+            "rank": "Private",
+            "serviceNumber": f"NA/SEED/{i:06d}",
+            "unit": f"Unit {i % 10}",
+            "corps": "Infantry",
+            "formation": SEED_FORMATIONS[i % len(SEED_FORMATIONS)],
+            "salary": {"conafss": 100000.0, "staffGrant": 5000.0},
+            "deductions": {"incomeTax": 7000.0},
+            "status": "active" if i % 7 else "inactive",
+            "createdAt": now,
+            "updatedAt": now,
+        }
+        for i in range(1, personnel + 1)
+    ]
+    db.soldiers.insert_many(soldiers)
+    db.users.insert_many([
+        {"fullName": f"Seed User {i}", "email": f"seed{i}@example.com",
+         "serviceNumber": soldier["serviceNumber"], "createdAt": now}
+        for i, soldier in enumerate(soldiers[:20], start=1)
+    ])
+
+    lines = [
+        {key: soldier[key] for key in ("serviceNumber", "firstName", "lastName", "rank", "unit", "formation", "salary", "deductions")}
+        for soldier in soldiers
+    ]
+    start = now - timedelta(days=31 * months)
+    payrolls = []
+    for offset in range(months):
+        approved_at = start + timedelta(days=31 * offset)
+        payrolls.append({
+            "month": MONTHS[approved_at.month - 1],
+            "year": approved_at.year,
+            "personnel": lines,
+            "totalAmount": 98000.0 * len(lines),
+            "status": "approved",
+            "approvedAt": approved_at,
+            "createdAt": approved_at,
+            "integrity": {"root": "seed", "verifiedAt": None},
+        })
+    db.payrolls.insert_many(payrolls)
+    db.payroll_integrity.insert_many([{"_id": payroll["_id"], "root": "seed"} for payroll in payrolls])
+
+    plan_ids = db.deduction_plans.insert_many([
+        {"serviceNumber": soldier["serviceNumber"], "formation": soldier["formation"],
+         "type": "loan", "status": "active", "createdAt": now}
+        for soldier in soldiers[:50]
+    ]).inserted_ids
+    db.deduction_installments.insert_many([
+        {"planId": plan_id, "serviceNumber": soldier["serviceNumber"], "formation": soldier["formation"],
+         "period": period_key(MONTHS[(m % 12)], SEED_YEAR + m // 12), "amount": 1000.0, "status": "due"}
+        for plan_id, soldier in zip(plan_ids, soldiers)
+        for m in range(12)
+    ])
+    db.arrears.insert_many([
+        {"serviceNumber": soldier["serviceNumber"], "amount": 2500.0, "status": "pending", "payrollId": None}
+        for soldier in soldiers[:30]
+    ])
+    db.arrears_batches.insert_one({
+        "changeKey": rate_change_key(SEED_RATE_CHANGE), "fromPeriod": SEED_PERIOD, "toPeriod": SEED_PERIOD,
+        "formation": None, "createdAt": now, "status": "pending",
+    })
+    return {"soldiers": len(soldiers), "payrolls": len(payrolls)}
+
+
+# ------------------------------
+# 🔬 PLAN CHECKS
+# ------------------------------
+def _stages(plan):
+    """Every stage name in a winning plan tree"""
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan", "winningPlan"):
+        if key in plan:
+            yield from _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        yield from _stages(child)
+
+
+def explain_query(db, query):
+    if "pipeline" in query:
+        command = {"aggregate": query["collection"], "pipeline": query["pipeline"], "cursor": {}}
+    elif "distinct" in query:
+        command = {"distinct": query["collection"], "key": query["distinct"], "query": query.get("filter", {})}
+    else:
+        command = {"find": query["collection"], "filter": query["filter"]}
+        if query.get("sort"):
+            command["sort"] = query["sort"]
+        if query.get("limit"):
+            command["limit"] = query["limit"]
+    return db.command("explain", command, verbosity="executionStats")
+
+
+def _plan_and_stats(explained):
+    """
+    Winning plan and execution stats of an explain. Aggregates whose first
+    stage ran as a find report them under stages[0].$cursor.
+    """
+    if "queryPlanner" not in explained and explained.get("stages"):
+        explained = explained["stages"][0].get("$cursor", {})
+    return explained["queryPlanner"]["winningPlan"], explained.get("executionStats", {})
+
+
+def check_queries(db, max_ratio=10.0, queries=ROUTE_QUERIES):
+    """
+    Explain every registered route query. A query fails on any COLLSCAN or
+    when it examines more than `max_ratio` documents per document returned.
+    """
+    results = []
+    for query in queries:
+        plan, stats = _plan_and_stats(explain_query(db, query))
+        stages = set(_stages(plan))
+        examined = stats.get("totalDocsExamined", 0)
+        returned = stats.get("nReturned", 0)
+        ratio = examined / max(returned, 1)
+
+        problems = []
+        if "COLLSCAN" in stages and not query.get("fullScan"):
+            problems.append("COLLSCAN")
+        if ratio > max_ratio:
+            problems.append(f"examined/returned {ratio:.1f} > {max_ratio}")
+
+        results.append({
+            "route": query["route"],
+            "collection": query["collection"],
+            "stages": sorted(stages),
+            "docsExamined": examined,
+            "returned": returned,
+            "problems": problems,
+        })
+    return results
@@ -0,0 +1,245 @@
+import os
+import json
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from bson.objectid import ObjectId
+from pymongo import MongoClient
+from app.utils import period_key
+from app.archive import iter_payroll_lines
+
+SALARY_COMPONENTS = ("conafss", "staffGrant", "specialForcesAllowance", "packingAllowance")
+TARGET_FIELDS = ("rank", "unit", "corps", "serviceNumber")
+LINE_FIELDS = ("serviceNumber", "firstName", "lastName", "rank", "unit", "corps", "salary")
+
+_worker_db = None
+_worker_archive_dir = None
+
+# One long-lived pool per web process, created on first use; spawning
+# workers per request would pay interpreter start-up on every retro run
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def validate_rate_change(rate_change):
+    """
+    Check a backdated rate change:
+    {"component": "conafss", "amount": 50000} sets a new value,
+    {"component": "conafss", "delta": 2500} adjusts the old one,
+    optional "filter": {"rank": ..., "unit": ..., "corps": ..., "serviceNumber": [...]}.
+    """
+    if not isinstance(rate_change, dict):
+        raise ValueError("rateChange must be an object")
+    if rate_change.get("component") not in SALARY_COMPONENTS:
+        raise ValueError(f"component must be one of {', '.join(SALARY_COMPONENTS)}")
+    if (rate_change.get("amount") is None) == (rate_change.get("delta") is None):
+        raise ValueError("Provide exactly one of amount or delta")
+    for field in (rate_change.get("filter") or {}):
+        if field not in TARGET_FIELDS:
+            raise ValueError(f"filter fields must be in {', '.join(TARGET_FIELDS)}")
+    return rate_change
+
+
+def rate_change_key(rate_change):
+    """
+    Identity of a rate change for duplicate detection: the component and the
+    personnel it targets, independent of key order
+    """
+    return json.dumps(
+        {"component": rate_change["component"], "filter": rate_change.get("filter") or {}},
+        sort_keys=True,
+    )
+
+
+def line_matches(line, target):
+    """True if a payroll line is covered by the rate change filter"""
+    for field, expected in (target or {}).items():
+        value = line.get(field)
+        if isinstance(expected, list):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+
+def recalculate_line(line, rate_change):
+    """
+    Return what the line should have received minus what it was paid for the
+    changed component, or 0 when the line is not affected.
+    """
+    if not line_matches(line, rate_change.get("filter")):
+        return 0.0
+
+    paid = float((line.get("salary") or {}).get(rate_change["component"], 0) or 0)
+    if rate_change.get("amount") is not None:
+        due = float(rate_change["amount"])
+    else:
+        due = paid + float(rate_change["delta"])
+    return round(due - paid, 2)
+
+
+def iter_line_diffs(lines, rate_change):
+    """Yield (line, difference) for every line the rate change affects"""
+    for line in lines:
+        difference = recalculate_line(line, rate_change)
+        if difference:
+            yield line, difference
+
+
+def diff_payroll(db, payroll_id, rate_change, archive_dir=None, archive_file=None):
+    """
+    Diff a single month: {serviceNumber: (firstName, lastName, difference)}
+    """
+    month_diffs = {}
+    lines = iter_payroll_lines(db, payroll_id, archive_dir, archive_file, LINE_FIELDS)
+    for line, difference in iter_line_diffs(lines, rate_change):
+        service_number = line.get("serviceNumber")
+        _, _, running = month_diffs.get(service_number, (None, None, 0.0))
+        month_diffs[service_number] = (line.get("firstName"), line.get("lastName"), running + difference)
+    return month_diffs
+
+
+def _init_worker(mongo_uri, archive_dir):
+    global _worker_db, _worker_archive_dir
+    _worker_db = MongoClient(mongo_uri).get_default_database()
+    _worker_archive_dir = archive_dir
+
+
+def _diff_payroll_worker(payroll_id, archive_file, rate_change):
+    return diff_payroll(_worker_db, ObjectId(payroll_id), rate_change, _worker_archive_dir, archive_file)
+
+
+def payrolls_in_range_query(from_period, to_period, formation=None):
+    """
+    Approved payrolls in the years a period range spans. A formation limits
+    this to its own runs and full-force runs.
+    """
+    years = range(int(from_period[:4]), int(to_period[:4]) + 1)
+    query = {"status": "approved", "year": {"$in": list(years)}}
+    if formation:
+        query["formation"] = {"$in": [formation, None]}
+    return query
+
+
+def iter_payrolls_in_range(db, from_period, to_period, formation=None):
+    """
+    Yield (payrollId, period, archiveFile) for approved payrolls between two
+    "YYYY-MM" periods, oldest first. Only headers are read here.
+    """
+    query = payrolls_in_range_query(from_period, to_period, formation)
+    headers = db.payrolls.find(query, {"month": 1, "year": 1, "archiveFile": 1})
+    in_range = []
+    for header in headers:
+        period = period_key(header["month"], header["year"])
+        if from_period <= period <= to_period:
+            in_range.append((str(header["_id"]), period, header.get("archiveFile")))
+    yield from sorted(in_range, key=lambda item: item[1])
+
+
+def compute_arrears(db, mongo_uri, archive_dir, from_period, to_period, rate_change,
+                    max_workers=None, formation=None):
+    """
+    Replay a backdated rate change over stored payrolls and return the
+    per-soldier arrears owed (positive) or overpaid (negative), optionally
+    for one formation's personnel only.
+
+    Months are diffed in parallel across a process pool; each worker streams
+    its month's lines, so memory stays bounded by one roster per worker.
+    """
+    payrolls = list(iter_payrolls_in_range(db, from_period, to_period, formation))
+    result = _compute_months(db, mongo_uri, archive_dir, payrolls, rate_change, max_workers)
+    if formation:
+        # Full-force runs hold every formation's lines
+        members = set(db.soldiers.distinct("serviceNumber", {"formation": formation}))
+        result["lines"] = [line for line in result["lines"] if line["serviceNumber"] in members]
+    return result
+
+
+def _retro_workers():
+    return max(1, int(os.getenv("RETRO_WORKERS", os.cpu_count() or 1)))
+
+
+def _get_pool(mongo_uri, archive_dir):
+    """
+    The process's shared retro pool, (re)created lazily. Workers are
+    spawned, not forked, so they never inherit the web app's Mongo client
+    or threads; create_app skips its start-up work inside them.
+    """
+    global _pool, _pool_key
+    with _pool_lock:
+        key = (mongo_uri, archive_dir)
+        if _pool is not None and _pool_key != key:
+            _pool.shutdown(wait=False)
+            _pool = None
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=_retro_workers(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=key,
+            )
+            _pool_key = key
+        return _pool
+
+
+def _reset_pool(pool):
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
+
+
+@atexit.register
+def _shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _compute_months(db, mongo_uri, archive_dir, payrolls, rate_change, max_workers=None):
+    workers = max_workers or _retro_workers()
+    if min(workers, len(payrolls)) <= 1:
+        month_results = (
+            diff_payroll(db, ObjectId(payroll_id), rate_change, archive_dir, archive_file)
+            for payroll_id, _, archive_file in payrolls
+        )
+        return _merge_months(month_results, payrolls)
+
+    pool = _get_pool(mongo_uri, archive_dir)
+    try:
+        month_results = list(pool.map(
+            _diff_payroll_worker,
+            [payroll_id for payroll_id, _, _ in payrolls],
+            [archive_file for _, _, archive_file in payrolls],
+            [rate_change] * len(payrolls),
+        ))
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM); drop the pool so the next run rebuilds it
+        _reset_pool(pool)
+        raise
+    return _merge_months(month_results, payrolls)
+
+
+def _merge_months(month_results, payrolls):
+    arrears = {}
+    for (_, period, _), month_diffs in zip(payrolls, month_results):
+        for service_number, (first_name, last_name, difference) in month_diffs.items():
+            entry = arrears.setdefault(service_number, {
+                "serviceNumber": service_number,
+                "firstName": first_name,
+                "lastName": last_name,
+                "periods": [],
+                "amount": 0.0,
+            })
+            entry["periods"].append(period)
+            entry["amount"] = round(entry["amount"] + difference, 2)
+
+    return {
+        "periods": [period for _, period, _ in payrolls],
+        "lines": [entry for entry in arrears.values() if entry["amount"]],
+    }
+
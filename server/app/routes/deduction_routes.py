@@ -0,0 +1,304 @@
+from flask import Blueprint, request, jsonify
+from bson.objectid import ObjectId
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+from app import mongo
+from app.models.deduction_model import (
+    DEDUCTION_TYPES,
+    deduction_plan_schema,
+    deduction_installment_item,
+)
+from app.models.payroll_model import compute_line_totals
+from app.partitions import current_formation, scoped, load_formation_scope
+from app.utils import serialize_doc, serialize_list, period_key, add_months
+
+deduction_routes = Blueprint("deduction_routes", __name__)
+deduction_routes.before_request(load_formation_scope)
+
+# ------------------------------
+# 🧮 SCHEDULE HELPERS (used by payroll routes)
+# ------------------------------
+def deduction_schedule_query(service_number=None, status=None, formation=None):
+    """
+    Filter for GET /deductions/schedule; results are sorted by createdAt
+    descending
+    """
+    query = {}
+    if service_number:
+        query["serviceNumber"] = service_number
+    if status:
+        query["status"] = status
+    if formation:
+        query["formation"] = formation
+    return query
+
+
+def due_installments_query(period, service_numbers=None, formation=None):
+    query = {"period": period, "status": "due"}
+    if service_numbers is not None:
+        query["serviceNumber"] = {"$in": list(service_numbers)}
+    if formation:
+        query["formation"] = formation
+    return query
+
+
+def fetch_due_installments(period, service_numbers=None, formation=None):
+    """
+    Fetch every installment due in a period with one indexed query and
+    group them by serviceNumber so payroll lines can be joined in O(1).
+    """
+    query = due_installments_query(period, service_numbers, formation)
+
+    due_by_soldier = {}
+    for installment in mongo.db.deduction_installments.find(query):
+        due_by_soldier.setdefault(installment["serviceNumber"], []).append(installment)
+    return due_by_soldier
+
+
+def merge_scheduled_deductions(personnel, due_by_soldier):
+    """
+    Add each soldier's due installments to their payroll line as a single
+    `scheduled` deduction and recompute the line totals.
+    """
+    for item in personnel:
+        installments = due_by_soldier.get(item.get("serviceNumber"), [])
+        deductions = dict(item.get("deductions") or {})
+        deductions["scheduled"] = round(sum(i["amount"] for i in installments), 2)
+        item["deductions"] = deductions
+        item["scheduledDeductions"] = [
+            {
+                "installmentId": str(i["_id"]),
+                "planId": str(i["planId"]),
+                "type": i.get("type"),
+                "description": i.get("description"),
+                "amount": i["amount"],
+            }
+            for i in installments
+        ]
+        compute_line_totals(item)
+    return personnel
+
+
+def apply_installments(due_by_soldier, payroll_id, session=None):
+    """
+    Mark joined installments as applied and decrement plan balances in one
+    batched pass. Only installments that were still due when flipped are
+    counted; the applied ones are returned grouped by serviceNumber so the
+    payroll lines can be re-joined against exactly what was collected.
+    """
+    ids = [i["_id"] for group in due_by_soldier.values() for i in group]
+    if not ids:
+        return {}
+
+    now = datetime.now(timezone.utc)
+    mongo.db.deduction_installments.update_many(
+        {"_id": {"$in": ids}, "status": "due"},
+        {"$set": {"status": "applied", "payrollId": payroll_id, "appliedAt": now}},
+        session=session,
+    )
+    applied = list(mongo.db.deduction_installments.find(
+        {"_id": {"$in": ids}, "status": "applied", "payrollId": payroll_id},
+        session=session,
+    ))
+    if not applied:
+        return {}
+
+    applied_by_soldier = {}
+    per_plan = {}
+    for installment in applied:
+        applied_by_soldier.setdefault(installment["serviceNumber"], []).append(installment)
+        amount, count = per_plan.get(installment["planId"], (0, 0))
+        per_plan[installment["planId"]] = (amount + installment["amount"], count + 1)
+
+    mongo.db.deduction_plans.bulk_write([
+        UpdateOne(
+            {"_id": plan_id},
+            {
+                "$inc": {"balance": -round(amount, 2), "installmentsPaid": count},
+                "$set": {"updatedAt": now},
+            },
+        )
+        for plan_id, (amount, count) in per_plan.items()
+    ], ordered=False, session=session)
+    mongo.db.deduction_plans.update_many(
+        {"_id": {"$in": list(per_plan)}, "status": "active", "balance": {"$lte": 0}},
+        {"$set": {"status": "completed", "balance": 0}},
+        session=session,
+    )
+    return applied_by_soldier
+
+
+def revert_installments(payroll_id):
+    """
+    Undo installments applied by a payroll that is being deleted. Plans the
+    payroll completed become active again; installments of cancelled plans
+    are dropped rather than made due again.
+    """
+    installments = list(mongo.db.deduction_installments.find(
+        {"payrollId": payroll_id, "status": "applied"}
+    ))
+    if not installments:
+        return 0
+
+    now = datetime.now(timezone.utc)
+    per_plan = {}
+    for installment in installments:
+        amount, count = per_plan.get(installment["planId"], (0, 0))
+        per_plan[installment["planId"]] = (amount + installment["amount"], count + 1)
+
+    cancelled = set(mongo.db.deduction_plans.distinct(
+        "_id", {"_id": {"$in": list(per_plan)}, "status": "cancelled"}
+    ))
+    mongo.db.deduction_installments.delete_many({
+        "_id": {"$in": [i["_id"] for i in installments if i["planId"] in cancelled]}
+    })
+    mongo.db.deduction_installments.update_many(
+        {"_id": {"$in": [i["_id"] for i in installments if i["planId"] not in cancelled]}},
+        {"$set": {"status": "due", "payrollId": None, "appliedAt": None}},
+    )
+    mongo.db.deduction_plans.bulk_write([
+        UpdateOne(
+            {"_id": plan_id},
+            {
+                "$inc": {"balance": round(amount, 2), "installmentsPaid": -count},
+                "$set": {"updatedAt": now},
+            },
+        )
+        for plan_id, (amount, count) in per_plan.items()
+    ], ordered=False)
+    mongo.db.deduction_plans.update_many(
+        {"_id": {"$in": list(per_plan)}, "status": "completed"},
+        {"$set": {"status": "active"}},
+    )
+    return len(installments)
+
+# ------------------------------
+# ➕ CREATE DEDUCTION SCHEDULE
+# ------------------------------
+@deduction_routes.route("/deductions/schedule", methods=["POST"])
+def create_deduction_schedule():
+    """
+    Create a loan/arrears/installment plan and its monthly installments
+    """
+    try:
+        data = request.get_json()
+
+        required_fields = ["serviceNumber", "totalAmount", "installments", "startMonth", "startYear"]
+        if not all(field in data and data[field] for field in required_fields):
+            return jsonify({"error": "Missing required fields"}), 400
+
+        if data.get("type", "installment") not in DEDUCTION_TYPES:
+            return jsonify({"error": f"Type must be one of {', '.join(DEDUCTION_TYPES)}"}), 400
+
+        total_amount = float(data["totalAmount"])
+        count = int(data["installments"])
+        if total_amount <= 0 or count <= 0:
+            return jsonify({"error": "Total amount and installments must be positive"}), 400
+
+        soldier = mongo.db.soldiers.find_one(
+            scoped({"serviceNumber": data["serviceNumber"]}), {"formation": 1}
+        )
+        if not soldier:
+            return jsonify({"error": "Personnel not found"}), 404
+
+        start_period = period_key(data["startMonth"], data["startYear"])
+        end_period = add_months(start_period, count - 1)
+        installment_amount = round(total_amount / count, 2)
+
+        plan = deduction_plan_schema(
+            data, installment_amount, start_period, end_period, soldier.get("formation")
+        )
+        result = mongo.db.deduction_plans.insert_one(plan)
+
+        # Last installment absorbs rounding so the plan sums to totalAmount
+        amounts = [installment_amount] * (count - 1)
+        amounts.append(round(total_amount - installment_amount * (count - 1), 2))
+        mongo.db.deduction_installments.insert_many([
+            deduction_installment_item(plan, result.inserted_id, add_months(start_period, n), amount)
+            for n, amount in enumerate(amounts)
+        ])
+
+        return jsonify({
+            "message": "Deduction schedule created successfully",
+            "data": serialize_doc(plan)
+        }), 201
+
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error creating deduction schedule: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+# ------------------------------
+# 📋 GET DEDUCTION SCHEDULES
+# ------------------------------
+@deduction_routes.route("/deductions/schedule", methods=["GET"])
+def get_deduction_schedules():
+    try:
+        filter_query = deduction_schedule_query(
+            request.args.get("serviceNumber"),
+            request.args.get("status"),
+            current_formation(),
+        )
+
+        plans = list(mongo.db.deduction_plans.find(filter_query).sort("createdAt", -1))
+        return jsonify(serialize_list(plans)), 200
+
+    except Exception as e:
+        print(f"Error fetching deduction schedules: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+
+# ------------------------------
+# 📆 GET INSTALLMENTS DUE FOR A MONTH
+# ------------------------------
+@deduction_routes.route("/deductions/due", methods=["GET"])
+def get_due_deductions():
+    try:
+        month = request.args.get("month")
+        year = request.args.get("year")
+        if not month or not year:
+            return jsonify({"error": "Month and year are required"}), 400
+
+        due_by_soldier = fetch_due_installments(
+            period_key(month, year), formation=current_formation()
+        )
+        installments = [
+            serialize_doc(i) for group in due_by_soldier.values() for i in group
+        ]
+
+        return jsonify({
+            "installments": installments,
+            "totalAmount": round(sum(i["amount"] for i in installments), 2),
+            "count": len(installments)
+        }), 200
+
+    except Exception as e:
+        print(f"Error fetching due deductions: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+
+# ------------------------------
+# 🗑️ CANCEL DEDUCTION SCHEDULE
+# ------------------------------
+@deduction_routes.route("/deductions/schedule/<id>", methods=["DELETE"])
+def cancel_deduction_schedule(id):
+    """
+    Cancel a plan; installments already applied to payrolls are kept
+    """
+    try:
+        if not ObjectId.is_valid(id):
+            return jsonify({"error": "Invalid ID format"}), 400
+
+        result = mongo.db.deduction_plans.update_one(
+            scoped({"_id": ObjectId(id)}),
+            {"$set": {"status": "cancelled", "updatedAt": datetime.now(timezone.utc)}}
+        )
+        if result.matched_count == 0:
+            return jsonify({"error": "Deduction schedule not found"}), 404
+
+        mongo.db.deduction_installments.delete_many({"planId": ObjectId(id), "status": "due"})
+
+        return jsonify({"message": "Deduction schedule cancelled successfully"}), 200
+
+    except Exception as e:
+        print(f"Error cancelling deduction schedule: {str(e)}")
+        return jsonify({"error": str(e)}), 400
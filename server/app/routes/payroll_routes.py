@@ -1,21 +1,51 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from bson.objectid import ObjectId
 from datetime import datetime, timezone
 from app import mongo
-from app.models.payroll_model import payroll_schema, payroll_personnel_item
-from app.utils import serialize_list
+from app.models.payroll_model import payroll_schema
+from app.utils import serialize_list, period_key, run_in_transaction
+from app.archive import archive_payrolls, read_archived_personnel, ArchiveError
+from app.compression import list_response
+from app.integrity import seal_personnel, verify_payroll
+from app.partitions import (
+    FormationScopeError,
+    load_formation_scope,
+    current_formation,
+    scoped,
+    resolve_formation,
+    payroll_conflict_query,
+    run_payroll,
+)
+from app.routes.deduction_routes import (
+    fetch_due_installments,
+    merge_scheduled_deductions,
+    apply_installments,
+    revert_installments,
+)
+from app.routes.retro_routes import (
+    fetch_pending_arrears,
+    merge_arrears,
+    apply_arrears,
+    revert_arrears,
+)
 import json
 
 payroll_routes = Blueprint("payroll_routes", __name__)
+payroll_routes.before_request(load_formation_scope)
 
 # ------------------------------
 # 🧹 SANITIZER — Prevent MongoDB 8-byte int overflow
 # ------------------------------
+# Identifiers that must stay strings even when they look numeric
+IDENTIFIER_FIELDS = {"_id", "serviceNumber", "accountNumber", "installmentId", "planId"}
+
 def sanitize_for_mongo(obj):
     if isinstance(obj, dict):
         clean = {}
         for k, v in obj.items():
-            if isinstance(v, (int, float)):
+            if k in IDENTIFIER_FIELDS and isinstance(v, str):
+                clean[k] = v
+            elif isinstance(v, (int, float)):
                 # Remove infinity/nan and large numbers
                 if not (float('-inf') < v < float('inf')):
                     clean[k] = 0
@@ -45,27 +75,30 @@ def sanitize_for_mongo(obj):
 @payroll_routes.route("/payroll/active-personnel", methods=["GET"])
 def get_active_personnel():
     """
-    Get all active personnel for payroll processing
+    Get all active personnel for payroll processing, computed per formation
+    in parallel. Pass ?month=&year= to preview arrears and scheduled
+    deductions due that month, and ?formation= (headquarters only) to run a
+    single formation.
     """
     try:
-        # Fetch only active soldiers
-        soldiers = list(mongo.db.soldiers.find({"status": "active"}))
-        
-        personnel_list = []
-        total_amount = 0
-        
-        for soldier in soldiers:
-            soldier['_id'] = str(soldier['_id'])
-            personnel_item = payroll_personnel_item(soldier)
-            personnel_list.append(personnel_item)
-            total_amount += float(personnel_item.get('netPay', 0))
+        formation = resolve_formation(request.args.get("formation"))
+
+        month = request.args.get("month")
+        year = request.args.get("year")
+        period = period_key(month, year) if month and year else None
+
+        run = run_payroll(mongo.db, period, formation)
         
-        return jsonify({
-            "personnel": personnel_list,
-            "totalAmount": float(total_amount),
-            "count": len(personnel_list)
-        }), 200
+        return list_response({
+            "personnel": run["personnel"],
+            "totalAmount": float(run["totalAmount"]),
+            "count": run["count"],
+            "formation": formation,
+            "partitions": run["partitions"]
+        }, list_key="personnel")
         
+    except FormationScopeError as e:
+        return jsonify({"error": str(e)}), 403
     except Exception as e:
         print(f"Error fetching active personnel: {str(e)}")
         return jsonify({"error": str(e)}), 400
@@ -76,7 +109,8 @@ def get_active_personnel():
 @payroll_routes.route("/payroll/approve", methods=["POST"])
 def approve_payroll():
     """
-    Approve and save payroll to history
+    Approve and save payroll to history. Each formation approves its own
+    run; omit personnel to have the server compute it.
     """
     try:
         data = request.get_json()
@@ -84,44 +118,91 @@ def approve_payroll():
         # Validate required fields
         if not data.get("month") or not data.get("year"):
             return jsonify({"error": "Month and year are required"}), 400
-        
-        if not data.get("personnel") or len(data.get("personnel", [])) == 0:
-            return jsonify({"error": "No personnel data provided"}), 400
+
+        formation = resolve_formation(data.get("formation"))
         
         # Check for existing payroll
-        existing_payroll = mongo.db.payrolls.find_one({
-            "month": data.get("month"),
-            "year": data.get("year")
-        })
+        existing_payroll = mongo.db.payrolls.find_one(
+            payroll_conflict_query(data.get("month"), data.get("year"), formation)
+        )
         if existing_payroll:
             return jsonify({"error": f"Payroll for {data.get('month')} {data.get('year')} already exists"}), 400
-        
-        # Calculate total using netPay
-        total_amount = sum([float(p.get("netPay", 0)) for p in data.get("personnel", [])])
-        
-        # Create payroll record
-        payroll_data = payroll_schema(data, data.get("personnel"), total_amount)
-        payroll_data["status"] = "approved"
-        payroll_data["approvedBy"] = data.get("approvedBy", "Admin")
-        payroll_data["approvedAt"] = datetime.now(timezone.utc)
-        
-        # ✅ Sanitize data before saving to Mongo
-        payroll_data = sanitize_for_mongo(payroll_data)
 
-        # Debug print (optional)
-        print("---- Sanitized payroll data preview ----")
-        print(json.dumps(payroll_data, indent=2, default=str))
-        print("---------------------------------------")
+        personnel = data.get("personnel")
+        if personnel is None:
+            personnel = run_payroll(mongo.db, None, formation)["personnel"]
+
+        if len(personnel) == 0:
+            return jsonify({"error": "No personnel data provided"}), 400
+
+        service_numbers = {p.get("serviceNumber") for p in personnel}
+        if formation:
+            in_formation = mongo.db.soldiers.count_documents(
+                {"formation": formation, "serviceNumber": {"$in": list(service_numbers)}}
+            )
+            if in_formation != len(service_numbers):
+                return jsonify({"error": f"Payroll includes personnel outside formation {formation}"}), 403
         
-        # Insert into DB
-        result = mongo.db.payrolls.insert_one(payroll_data)
-        payroll_data["_id"] = str(result.inserted_id)
+        # Pending retro arrears and scheduled deductions (loans, arrears
+        # recovery, installments) due this month
+        arrears_by_soldier = fetch_pending_arrears(service_numbers)
+        due_by_soldier = fetch_due_installments(
+            period_key(data.get("month"), data.get("year")),
+            service_numbers,
+        )
+        payroll_id = ObjectId()
+
+        def save(session):
+            # Claim the arrears and installments first, then join the lines
+            # against what was actually claimed: a schedule cancelled since
+            # the fetch is neither deducted nor taken off its plan's balance
+            paid_arrears = apply_arrears(arrears_by_soldier, payroll_id, session)
+            applied_installments = apply_installments(due_by_soldier, payroll_id, session)
+            merge_arrears(personnel, paid_arrears)
+            merge_scheduled_deductions(personnel, applied_installments)
+
+            # Calculate total using netPay
+            total_amount = sum([float(p.get("netPay", 0)) for p in personnel])
+
+            # Create payroll record
+            payroll_data = payroll_schema(data, personnel, total_amount)
+            payroll_data["_id"] = payroll_id
+            payroll_data["formation"] = formation
+            payroll_data["status"] = "approved"
+            payroll_data["approvedBy"] = data.get("approvedBy", "Admin")
+            payroll_data["approvedAt"] = datetime.now(timezone.utc)
+
+            # ✅ Sanitize data before saving to Mongo
+            payroll_data = sanitize_for_mongo(payroll_data)
+
+            # 🔐 Seal the lines exactly as stored: per-line hashes -> Merkle root
+            payroll_data["integrity"], integrity_levels = seal_personnel(payroll_data["personnel"])
+
+            # Debug print (optional)
+            print("---- Sanitized payroll data preview ----")
+            print(json.dumps(payroll_data, indent=2, default=str))
+            print("---------------------------------------")
+
+            # Insert into DB
+            mongo.db.payrolls.insert_one(payroll_data, session=session)
+            mongo.db.payroll_integrity.insert_one({
+                "_id": payroll_id,
+                "root": payroll_data["integrity"]["root"],
+                "levels": integrity_levels,
+            }, session=session)
+            return payroll_data
+
+        # One transaction: payroll, installment flips and plan balances
+        payroll_data = run_in_transaction(mongo.cx, save)
+        payroll_data["_id"] = str(payroll_id)
         
         return jsonify({
             "message": "Payroll approved and saved successfully",
             "data": payroll_data
         }), 201
         
+    except FormationScopeError as e:
+        return jsonify({"error": str(e)}), 403
     except Exception as e:
         print(f"Error approving payroll: {str(e)}")
         return jsonify({"error": str(e)}), 400
@@ -129,18 +210,26 @@ def approve_payroll():
 # ------------------------------
 # 📜 GET PAYROLL HISTORY
 # ------------------------------
+def payroll_history_query(year=None, status=None, formation=None):
+    query = {}
+    if year:
+        query["year"] = int(year)
+    if status:
+        query["status"] = status
+    if formation:
+        query["formation"] = formation
+    return query
+
+
 @payroll_routes.route("/payroll/history", methods=["GET"])
 def get_payroll_history():
     try:
         limit = int(request.args.get("limit", 50))
-        filter_query = {}
-        
-        year = request.args.get("year")
-        status = request.args.get("status")
-        if year:
-            filter_query["year"] = int(year)
-        if status:
-            filter_query["status"] = status
+        filter_query = payroll_history_query(
+            request.args.get("year"),
+            request.args.get("status"),
+            resolve_formation(request.args.get("formation")),
+        )
 
         payrolls = list(mongo.db.payrolls.find(filter_query).limit(limit))
         payrolls.sort(key=lambda x: x.get('createdAt', ''), reverse=True)
@@ -155,34 +244,101 @@ def get_payroll_history():
             "limit": limit
         }), 200
 
+    except FormationScopeError as e:
+        return jsonify({"error": str(e)}), 403
     except Exception as e:
         print(f"Error fetching payroll history: {str(e)}")
         return jsonify({"error": str(e)}), 400
 
+# ------------------------------
+# 🗄️ ARCHIVE OLD PAYROLLS
+# ------------------------------
+@payroll_routes.route("/payroll/archive", methods=["POST"])
+def archive_old_payrolls():
+    """
+    Move approved payrolls older than olderThanDays (default ARCHIVE_AFTER_DAYS)
+    into per-year archive files, leaving stub headers in Mongo
+    """
+    try:
+        if current_formation():
+            return jsonify({"error": "Only headquarters can archive payrolls"}), 403
+
+        data = request.get_json(silent=True) or {}
+        older_than_days = int(data.get("olderThanDays", current_app.config["ARCHIVE_AFTER_DAYS"]))
+
+        summary = archive_payrolls(mongo.db, current_app.config["ARCHIVE_DIR"], older_than_days)
+
+        return jsonify({
+            "message": f"Archived {summary['archived']} payroll(s)",
+            "data": summary
+        }), 200
+
+    except Exception as e:
+        print(f"Error archiving payrolls: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+
 # ------------------------------
 # 📄 GET SINGLE PAYROLL BY ID
 # ------------------------------
 @payroll_routes.route("/payroll/<id>", methods=["GET"])
 def get_payroll_by_id(id):
     """
-    Get a specific payroll record by ID
+    Get a specific payroll record by ID.
+    Archived payrolls are read back from their archive file; pass
+    ?fields=serviceNumber,netPay to decompress only those columns.
     """
     try:
         if not ObjectId.is_valid(id):
             return jsonify({"error": "Invalid ID format"}), 400
         
-        payroll = mongo.db.payrolls.find_one({"_id": ObjectId(id)})
+        payroll = mongo.db.payrolls.find_one(scoped({"_id": ObjectId(id)}))
         
         if not payroll:
             return jsonify({"error": "Payroll not found"}), 404
         
         payroll['_id'] = str(payroll['_id'])
-        return jsonify(payroll), 200
+
+        if payroll.get("archived"):
+            fields = request.args.get("fields")
+            payroll["personnel"] = read_archived_personnel(
+                current_app.config["ARCHIVE_DIR"],
+                payroll["archiveFile"],
+                payroll["_id"],
+                fields.split(",") if fields else None,
+            )
+
+        return list_response(payroll, list_key="personnel")
         
+    except ArchiveError as e:
+        print(f"Error reading archived payroll: {str(e)}")
+        return jsonify({"error": str(e)}), 500
     except Exception as e:
         print(f"Error fetching payroll: {str(e)}")
         return jsonify({"error": str(e)}), 400
 
+# ------------------------------
+# 🔐 VERIFY PAYROLL INTEGRITY
+# ------------------------------
+@payroll_routes.route("/payroll/<id>/verify", methods=["GET"])
+def verify_payroll_integrity(id):
+    """
+    Recompute the payroll's Merkle root and list the lines that changed
+    """
+    try:
+        if not ObjectId.is_valid(id):
+            return jsonify({"error": "Invalid ID format"}), 400
+
+        payroll = mongo.db.payrolls.find_one(scoped({"_id": ObjectId(id)}), {"personnel": 0})
+        if not payroll:
+            return jsonify({"error": "Payroll not found"}), 404
+
+        result = verify_payroll(mongo.db, current_app.config["ARCHIVE_DIR"], payroll)
+        return jsonify(result), 200 if result["status"] in ("ok", "unsealed") else 409
+
+    except Exception as e:
+        print(f"Error verifying payroll: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+
 # ------------------------------
 # 🗑️ DELETE PAYROLL
 # ------------------------------
@@ -195,10 +351,30 @@ def delete_payroll(id):
         if not ObjectId.is_valid(id):
             return jsonify({"error": "Invalid ID format"}), 400
         
+        payroll = mongo.db.payrolls.find_one(scoped({"_id": ObjectId(id)}), {"personnel": 0})
+        if not payroll:
+            return jsonify({"error": "Payroll not found"}), 404
+
         result = mongo.db.payrolls.delete_one({"_id": ObjectId(id)})
         
         if result.deleted_count == 0:
             return jsonify({"error": "Payroll not found"}), 404
+
+        # Leave a trace so the integrity audit can tell this from tampering
+        mongo.db.payroll_audit_log.insert_one({
+            "action": "deleted",
+            "payrollId": payroll["_id"],
+            "month": payroll.get("month"),
+            "year": payroll.get("year"),
+            "totalAmount": payroll.get("totalAmount"),
+            "root": (payroll.get("integrity") or {}).get("root"),
+            "deletedBy": request.args.get("deletedBy", "Admin"),
+            "deletedAt": datetime.now(timezone.utc),
+        })
+
+        # Return any installments this payroll collected to their plans
+        revert_installments(ObjectId(id))
+        revert_arrears(ObjectId(id))
         
         return jsonify({"message": "Payroll deleted successfully"}), 200
         
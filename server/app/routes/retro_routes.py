@@ -0,0 +1,192 @@
+from flask import Blueprint, request, jsonify, current_app
+from datetime import datetime, timezone
+from app import mongo
+from app.models.payroll_model import compute_line_totals
+from app.partitions import FormationScopeError, resolve_formation, scoped, load_formation_scope
+from app.retro import validate_rate_change, rate_change_key, compute_arrears
+from app.utils import serialize_doc, serialize_list, period_key
+
+retro_routes = Blueprint("retro_routes", __name__)
+retro_routes.before_request(load_formation_scope)
+
+# ------------------------------
+# 🧮 ARREARS HELPERS (used by payroll routes)
+# ------------------------------
+def pending_arrears_query(service_numbers):
+    return {"status": "pending", "serviceNumber": {"$in": list(service_numbers)}}
+
+
+def batch_overlap_query(change_key, from_period, to_period, formation=None):
+    """
+    Committed batches of the same rate change whose periods overlap the
+    range. A formation clashes with its own batches and full-force ones.
+    """
+    query = {
+        "changeKey": change_key,
+        "status": {"$in": ["pending", "paid"]},
+        "fromPeriod": {"$lte": to_period},
+        "toPeriod": {"$gte": from_period},
+    }
+    if formation:
+        query["formation"] = {"$in": [formation, None]}
+    return query
+
+
+def fetch_pending_arrears(service_numbers):
+    """
+    Fetch pending arrears for the given soldiers grouped by serviceNumber
+    """
+    due_by_soldier = {}
+    for line in mongo.db.arrears.find(pending_arrears_query(service_numbers)):
+        due_by_soldier.setdefault(line["serviceNumber"], []).append(line)
+    return due_by_soldier
+
+
+def merge_arrears(personnel, due_by_soldier):
+    """
+    Add pending arrears to each payroll line as a signed `arrears` earning
+    """
+    for item in personnel:
+        lines = due_by_soldier.get(item.get("serviceNumber"))
+        salary = dict(item.get("salary") or {})
+        if lines:
+            salary["arrears"] = round(sum(line["amount"] for line in lines), 2)
+        elif salary.pop("arrears", None) is None:
+            continue
+        item["salary"] = salary
+        compute_line_totals(item)
+    return personnel
+
+
+def apply_arrears(due_by_soldier, payroll_id, session=None):
+    """
+    Mark joined arrears as paid and return the ones this payroll actually
+    claimed, grouped by serviceNumber
+    """
+    ids = [line["_id"] for group in due_by_soldier.values() for line in group]
+    if not ids:
+        return {}
+    mongo.db.arrears.update_many(
+        {"_id": {"$in": ids}, "status": "pending"},
+        {"$set": {"status": "paid", "payrollId": payroll_id, "paidAt": datetime.now(timezone.utc)}},
+        session=session,
+    )
+    paid_by_soldier = {}
+    for line in mongo.db.arrears.find(
+        {"_id": {"$in": ids}, "status": "paid", "payrollId": payroll_id}, session=session
+    ):
+        paid_by_soldier.setdefault(line["serviceNumber"], []).append(line)
+    return paid_by_soldier
+
+
+def revert_arrears(payroll_id):
+    result = mongo.db.arrears.update_many(
+        {"payrollId": payroll_id, "status": "paid"},
+        {"$set": {"status": "pending", "payrollId": None, "paidAt": None}}
+    )
+    return result.modified_count
+
+# ------------------------------
+# 🔁 RETROACTIVE RECALCULATION
+# ------------------------------
+@retro_routes.route("/payroll/retro", methods=["POST"])
+def run_retro():
+    """
+    Replay a backdated salary change over approved payrolls and diff it per
+    soldier. Send "commit": true to queue the result as an arrears batch
+    that the next approved payroll pays out.
+    """
+    try:
+        data = request.get_json()
+
+        required_fields = ["fromMonth", "fromYear", "toMonth", "toYear", "rateChange"]
+        if not all(field in data and data[field] for field in required_fields):
+            return jsonify({"error": "Missing required fields"}), 400
+
+        rate_change = validate_rate_change(data["rateChange"])
+        from_period = period_key(data["fromMonth"], data["fromYear"])
+        to_period = period_key(data["toMonth"], data["toYear"])
+        if from_period > to_period:
+            return jsonify({"error": "Start period must not be after end period"}), 400
+        formation = resolve_formation(data.get("formation"))
+        change_key = rate_change_key(rate_change)
+
+        # Every run diffs against the stored lines, so committing the same
+        # change twice over overlapping months would pay the arrears twice
+        if data.get("commit"):
+            overlap = batch_overlap_query(change_key, from_period, to_period, formation)
+            existing = mongo.db.arrears_batches.find_one(overlap, {"fromPeriod": 1, "toPeriod": 1})
+            if existing:
+                return jsonify({
+                    "error": f"This rate change is already committed for {existing['fromPeriod']} to {existing['toPeriod']}",
+                    "batchId": str(existing["_id"]),
+                }), 409
+
+        result = compute_arrears(
+            mongo.db,
+            current_app.config["MONGO_URI"],
+            current_app.config["ARCHIVE_DIR"],
+            from_period,
+            to_period,
+            rate_change,
+            formation=formation,
+        )
+        total_amount = round(sum(line["amount"] for line in result["lines"]), 2)
+
+        batch = {
+            "fromPeriod": from_period,
+            "toPeriod": to_period,
+            "rateChange": rate_change,
+            "changeKey": change_key,
+            "formation": formation,
+            "periods": result["periods"],
+            "personnelCount": len(result["lines"]),
+            "totalAmount": total_amount,
+            "status": "preview",
+            "createdBy": data.get("createdBy", "Admin"),
+            "createdAt": datetime.now(timezone.utc),
+        }
+
+        if data.get("commit") and result["lines"]:
+            batch["status"] = "pending"
+            inserted = mongo.db.arrears_batches.insert_one(batch)
+            mongo.db.arrears.insert_many([
+                {
+                    "batchId": inserted.inserted_id,
+                    "serviceNumber": line["serviceNumber"],
+                    "formation": formation,
+                    "periods": line["periods"],
+                    "amount": line["amount"],
+                    "status": "pending",
+                    "payrollId": None,
+                    "paidAt": None,
+                }
+                for line in result["lines"]
+            ])
+
+        return jsonify({
+            "batch": serialize_doc(batch),
+            "lines": result["lines"],
+        }), 201 if batch["status"] == "pending" else 200
+
+    except FormationScopeError as e:
+        return jsonify({"error": str(e)}), 403
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print(f"Error running retro calculation: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+# ------------------------------
+# 📜 GET ARREARS BATCHES
+# ------------------------------
+@retro_routes.route("/payroll/retro/batches", methods=["GET"])
+def get_arrears_batches():
+    try:
+        limit = int(request.args.get("limit", 50))
+        batches = list(mongo.db.arrears_batches.find(scoped()).sort("createdAt", -1).limit(limit))
+        return jsonify(serialize_list(batches)), 200
+
+    except Exception as e:
+        print(f"Error fetching arrears batches: {str(e)}")
+        return jsonify({"error": str(e)}), 400
@@ -172,10 +172,39 @@ from datetime import datetime, timezone
 
 from itsdangerous import Serializer
 from app.models.staff_model import soldier_schema
+from app.models.payroll_model import compute_line_totals
 from app import mongo  
-from app.utils import serialize_list, serialize_doc
+from app.utils import serialize_list, serialize_doc, run_in_transaction
+from app.compression import list_response
+from app.search import staff_index
+from app.partitions import current_formation, scoped, load_formation_scope, move_soldier_records
 
 staff_routes = Blueprint("staff_routes", __name__)
+staff_routes.before_request(load_formation_scope)
+
+
+def pay_history_pipeline(service_numbers, limit):
+    """
+    Latest `limit` payrolls containing any of `service_numbers`, projected
+    down to that soldier's own line
+    """
+    return [
+        {"$match": {"personnel.serviceNumber": {"$in": service_numbers}}},
+        {"$sort": {"createdAt": -1}},
+        {"$limit": limit},
+        {"$project": {
+            "month": 1,
+            "year": 1,
+            "status": 1,
+            "approvedAt": 1,
+            "createdAt": 1,
+            "archived": 1,
+            "line": {"$first": {"$filter": {
+                "input": "$personnel",
+                "cond": {"$in": ["$$this.serviceNumber", service_numbers]},
+            }}},
+        }},
+    ]
 
 # ------------------------------
 # ➕ ADD SOLDIER
@@ -193,6 +222,11 @@ def add_soldier():
         # ✅ Build soldier document using schema
         soldier = soldier_schema(data)
 
+        # 🪖 Formation-scoped users can only add to their own formation
+        formation = current_formation()
+        if formation:
+            soldier["formation"] = formation
+
         # 🔍 Check if soldier with same serviceNumber already exists
         existing = mongo.db.soldiers.find_one({"serviceNumber": soldier["serviceNumber"]})
         if existing:
@@ -200,6 +234,7 @@ def add_soldier():
 
         # ✅ Insert into MongoDB
         mongo.db.soldiers.insert_one(soldier)
+        staff_index.upsert(soldier)
 
         return jsonify({
             "message": "Personnel added successfully",
@@ -215,10 +250,32 @@ def add_soldier():
 # ------------------------------
 @staff_routes.route("/staff", methods=["GET"])
 def get_all_soldiers():
-    soldiers = list(mongo.db.soldiers.find())
+    soldiers = list(mongo.db.soldiers.find(scoped()))
     for soldier in soldiers:
         soldier["_id"] = str(soldier["_id"])
-    return jsonify(serialize_list(soldiers)), 200
+    return list_response(serialize_list(soldiers))
+
+
+# ------------------------------
+# 🔎 PERSONNEL TYPEAHEAD
+# ------------------------------
+@staff_routes.route("/staff/suggest", methods=["GET"])
+def suggest_soldiers():
+    """
+    Ranked prefix matches on name, service number, unit and rank from the
+    in-memory staff index
+    """
+    try:
+        query = request.args.get("q", "")
+        limit = min(int(request.args.get("limit", 10)), 50)
+        status = request.args.get("status")
+
+        staff_index.ensure_built(mongo.db)
+        return jsonify(staff_index.suggest(query, limit, status, current_formation())), 200
+
+    except Exception as e:
+        print(f"Error suggesting staff: {str(e)}")
+        return jsonify({"error": str(e)}), 400
 
 
 # ------------------------------
@@ -229,13 +286,72 @@ def get_soldier(id):
     if not ObjectId.is_valid(id):
         return jsonify({"error": "Invalid ID format"}), 400
         
-    soldier = mongo.db.soldiers.find_one({"_id": ObjectId(id)})
+    soldier = mongo.db.soldiers.find_one(scoped({"_id": ObjectId(id)}))
     if not soldier:
         return jsonify({"error": "Soldier not found"}), 404
     soldier["_id"] = str(soldier["_id"])
     return jsonify(serialize_doc(soldier)), 200
 
 
+# ------------------------------
+# 💰 GET SOLDIER PAY HISTORY
+# ------------------------------
+@staff_routes.route("/staff/<id>/pay-history", methods=["GET"])
+def get_soldier_pay_history(id):
+    """
+    Return only this soldier's payroll lines from the most recent payrolls,
+    using the personnel.serviceNumber index and a $filter projection.
+    """
+    try:
+        if not ObjectId.is_valid(id):
+            return jsonify({"error": "Invalid ID format"}), 400
+
+        limit = int(request.args.get("months", 12))
+
+        soldier = mongo.db.soldiers.find_one(scoped({"_id": ObjectId(id)}), {"serviceNumber": 1})
+        if not soldier:
+            return jsonify({"error": "Soldier not found"}), 404
+
+        # Older payrolls may hold numeric service numbers coerced to floats
+        service_numbers = [soldier["serviceNumber"]]
+        try:
+            service_numbers.append(float(soldier["serviceNumber"]))
+        except (TypeError, ValueError):
+            pass
+
+        pipeline = pay_history_pipeline(service_numbers, limit)
+        history = []
+        totals = {"totalEarnings": 0.0, "totalDeductions": 0.0, "netPay": 0.0}
+        for payroll in mongo.db.payrolls.aggregate(pipeline):
+            line = payroll.pop("line") or {}
+            # Archived stubs only keep precomputed totals per line
+            if "salary" in line:
+                compute_line_totals(line)
+            for key in totals:
+                totals[key] += float(line.get(key) or 0)
+            payroll["payrollId"] = str(payroll.pop("_id"))
+            payroll.update({
+                "salary": line.get("salary", {}),
+                "deductions": line.get("deductions", {}),
+                "totalEarnings": line.get("totalEarnings") or 0,
+                "totalDeductions": line.get("totalDeductions") or 0,
+                "netPay": line.get("netPay") or 0,
+                "archived": payroll.get("archived", False),
+            })
+            history.append(serialize_doc(payroll))
+
+        return jsonify({
+            "serviceNumber": soldier["serviceNumber"],
+            "history": history,
+            "totals": {key: round(value, 2) for key, value in totals.items()},
+            "count": len(history)
+        }), 200
+
+    except Exception as e:
+        print(f"Error fetching pay history: {str(e)}")
+        return jsonify({"error": str(e)}), 400
+
+
 # ------------------------------
 # 🔄 TOGGLE SOLDIER STATUS
 # ------------------------------
@@ -246,7 +362,7 @@ def toggle_soldier_status(id):
             return jsonify({"error": "Invalid ID format"}), 400
         
         # Get current soldier
-        soldier = mongo.db.soldiers.find_one({"_id": ObjectId(id)})
+        soldier = mongo.db.soldiers.find_one(scoped({"_id": ObjectId(id)}))
         if not soldier:
             return jsonify({"error": "Personnel not found"}), 404
         
@@ -265,6 +381,7 @@ def toggle_soldier_status(id):
             },
             return_document=True
         )
+        staff_index.upsert(result)
         
         result['_id'] = str(result['_id'])
         
@@ -301,6 +418,7 @@ def update_soldier(id):
             "serviceNumber": data.get("serviceNumber"),
             "unit": data.get("unit"),
             "corps": data.get("corps"),
+            "formation": data.get("formation"),
             "bankName": data.get("bankName"),
             "accountNumber": data.get("accountNumber"),
             "passport": data.get("passport"),
@@ -330,16 +448,34 @@ def update_soldier(id):
         
         # Remove None values
         update_data = {k: v for k, v in update_data.items() if v is not None}
-        
+
+        # 🪖 Formation-scoped users cannot move personnel out of their formation
+        if current_formation():
+            update_data.pop("formation", None)
+        
+        def save(session):
+            before = mongo.db.soldiers.find_one(
+                scoped({"_id": ObjectId(id)}), {"serviceNumber": 1, "formation": 1}, session=session
+            )
+            if not before:
+                return None
+            updated = mongo.db.soldiers.find_one_and_update(
+                {"_id": before["_id"]},
+                {"$set": update_data},
+                return_document=True,
+                session=session,
+            )
+            # Deduction and arrears rows carry the formation too; move them along
+            if "formation" in update_data and update_data["formation"] != before.get("formation"):
+                move_soldier_records(mongo.db, before["serviceNumber"], update_data["formation"], session)
+            return updated
+
         # Update in database
-        result = mongo.db.soldiers.find_one_and_update(
-            {"_id": ObjectId(id)},
-            {"$set": update_data},
-            return_document=True
-        )
+        result = run_in_transaction(mongo.cx, save)
         
         if not result:
             return jsonify({"error": "Staff not found"}), 404
+        staff_index.upsert(result)
         
         result['_id'] = str(result['_id'])
         
@@ -361,10 +497,11 @@ def delete_soldier(id):
         if not ObjectId.is_valid(id):
             return jsonify({"error": "Invalid ID format"}), 400
             
-        result = mongo.db.soldiers.delete_one({"_id": ObjectId(id)})
+        result = mongo.db.soldiers.delete_one(scoped({"_id": ObjectId(id)}))
         
         if result.deleted_count == 0:
             return jsonify({"error": "Staff not found"}), 404
+        staff_index.remove(id)
             
         return jsonify({"message": "Staff deleted successfully"}), 200
         
@@ -0,0 +1,315 @@
+import re
+import sys
+import heapq
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from functools import lru_cache
+from bson.objectid import ObjectId
+
+INDEXED_FIELDS = ("firstName", "lastName", "serviceNumber", "unit", "rank")
+FILTER_FIELDS = ("status", "formation")
+COLUMNS = INDEXED_FIELDS + FILTER_FIELDS
+PROJECTION = {field: 1 for field in COLUMNS}
+
+# Field weights for ranking; an exact token match doubles the weight
+FIELD_WEIGHTS = {"serviceNumber": 8, "lastName": 5, "firstName": 4, "unit": 2, "rank": 1}
+FIELD_CODES = {field: code for code, field in enumerate(INDEXED_FIELDS)}
+COMPACT_RATIO = 0.2
+OID_SIZE = 12
+# Unique per soldier, so not worth interning in the shared value table
+UNIQUE_FIELD = "serviceNumber"
+
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+
+
+def tokenize(value):
+    """Lower-cased alphanumeric tokens of a field value"""
+    if value is None:
+        return []
+    return [sys.intern(token) for token in _TOKEN_SPLIT.split(str(value).lower()) if token]
+
+
+@lru_cache(maxsize=8192)
+def _field_tokens(field, value):
+    """Tokens a field value is indexed under"""
+    tokens = tokenize(value)
+    if field == "serviceNumber" and len(tokens) > 1:
+        # Let "na123" find "NA/123"
+        tokens.append("".join(tokens))
+    return tuple(dict.fromkeys(tokens))
+
+
+class StaffIndex:
+    """
+    In-process prefix index over personnel for typeahead search.
+
+    Each indexed field keeps its own sorted token list with a parallel
+    compact array of document slots, so a prefix lookup is a bisect plus a
+    contiguous scan. Per-soldier data is columnar and indexed by slot:
+    repeated fields (names, unit, rank, status, formation) are arrays of
+    ids into one shared table of distinct values, service numbers are a
+    plain list since they never repeat, and ObjectIds are packed into a
+    bytearray that is searched directly on writes.
+
+    A query walks the most selective term's postings in descending weight
+    order (exact matches before prefixes, heavier fields first), applies
+    the status/formation filters as it goes, checks the other terms against
+    the candidate's field values, and stops once no unscanned posting can
+    beat the current top `limit`. Removed or edited personnel leave a dead
+    slot that is skipped and reclaimed by periodic compaction.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._tokens = [[] for _ in INDEXED_FIELDS]
+        self._slots = [array("I") for _ in INDEXED_FIELDS]
+        # Value table shared by every column; id 0 is None
+        self._values = [None]
+        self._value_ids = {}
+        self._columns = {field: array("I") for field in COLUMNS if field != UNIQUE_FIELD}
+        self._service_numbers = []
+        self._oids = bytearray()
+        self._live = bytearray()
+        self._dead = 0
+        self.built = False
+
+    def __len__(self):
+        return len(self._live) - self._dead
+
+    # ------------------------------
+    # Build & maintenance
+    # ------------------------------
+    def build(self, db):
+        """Rebuild from a projected scan of the soldiers collection"""
+        fresh = StaffIndex()
+        entries = [[] for _ in INDEXED_FIELDS]
+        for soldier in db.soldiers.find({}, PROJECTION):
+            slot = fresh._append(soldier)
+            for token, code in self._doc_tokens(soldier):
+                entries[code].append((token, slot))
+        for postings in entries:
+            postings.sort()
+        fresh._tokens = [[token for token, _ in postings] for postings in entries]
+        fresh._slots = [array("I", (slot for _, slot in postings)) for postings in entries]
+        del entries
+
+        with self._lock:
+            for name in ("_tokens", "_slots", "_values", "_value_ids", "_columns",
+                         "_service_numbers", "_oids", "_live", "_dead"):
+                setattr(self, name, getattr(fresh, name))
+            self.built = True
+        return len(self)
+
+    def ensure_built(self, db):
+        if not self.built:
+            self.build(db)
+
+    def upsert(self, soldier):
+        """Add or replace one soldier after a staff write"""
+        with self._lock:
+            self._remove_slot(soldier["_id"])
+            slot = self._append(soldier)
+            for token, code in self._doc_tokens(soldier):
+                position = bisect_left(self._tokens[code], token)
+                self._tokens[code].insert(position, token)
+                self._slots[code].insert(position, slot)
+            self._maybe_compact()
+
+    def remove(self, soldier_id):
+        with self._lock:
+            self._remove_slot(soldier_id)
+            self._maybe_compact()
+
+    def _append(self, soldier):
+        """Store one soldier's columns in a new slot"""
+        slot = len(self._live)
+        self._oids += ObjectId(str(soldier["_id"])).binary
+        self._live.append(1)
+        self._service_numbers.append(soldier.get(UNIQUE_FIELD))
+        for field, column in self._columns.items():
+            value = soldier.get(field)
+            if field == "status" and value is None:
+                value = "active"
+            column.append(self._value_id(value))
+        return slot
+
+    def _value_id(self, value):
+        if value is None:
+            return 0
+        value_id = self._value_ids.get(value)
+        if value_id is None:
+            value_id = self._value_ids[value] = len(self._values)
+            self._values.append(value)
+        return value_id
+
+    def _find_slot(self, soldier_id):
+        """Live slot holding `soldier_id`, or None"""
+        oid = ObjectId(str(soldier_id)).binary
+        position = self._oids.find(oid)
+        while position != -1:
+            slot, offset = divmod(position, OID_SIZE)
+            if not offset and self._live[slot]:
+                return slot
+            position = self._oids.find(oid, position + 1)
+        return None
+
+    def _remove_slot(self, soldier_id):
+        slot = self._find_slot(soldier_id)
+        if slot is not None:
+            self._live[slot] = 0
+            self._dead += 1
+
+    def _maybe_compact(self):
+        if not self._live or self._dead / len(self._live) < COMPACT_RATIO:
+            return
+        remap = array("I", bytes(4 * len(self._live)))
+        kept = 0
+        for slot, live in enumerate(self._live):
+            if live:
+                remap[slot] = kept
+                kept += 1
+
+        for code in range(len(INDEXED_FIELDS)):
+            tokens, slots = [], array("I")
+            for token, slot in zip(self._tokens[code], self._slots[code]):
+                if self._live[slot]:
+                    tokens.append(token)
+                    slots.append(remap[slot])
+            self._tokens[code], self._slots[code] = tokens, slots
+
+        live_slots = [slot for slot, live in enumerate(self._live) if live]
+        self._columns = {
+            field: array("I", (column[slot] for slot in live_slots))
+            for field, column in self._columns.items()
+        }
+        self._service_numbers = [self._service_numbers[slot] for slot in live_slots]
+        self._oids = bytearray().join(
+            self._oids[slot * OID_SIZE:(slot + 1) * OID_SIZE] for slot in live_slots
+        )
+        self._live = bytearray(b"\x01" * len(live_slots))
+        self._dead = 0
+
+    @staticmethod
+    def _doc_tokens(soldier):
+        for field in INDEXED_FIELDS:
+            for token in _field_tokens(field, soldier.get(field)):
+                yield token, FIELD_CODES[field]
+
+    # ------------------------------
+    # Query
+    # ------------------------------
+    def suggest(self, query, limit=10, status=None, formation=None):
+        """
+        Ranked top-`limit` personnel whose tokens start with every term in
+        `query`, optionally limited to one status and formation. Equal
+        scores keep token order.
+        """
+        terms = tokenize(query)
+        if not terms or limit <= 0:
+            return []
+
+        with self._lock:
+            filters = []
+            for field, wanted in (("status", status), ("formation", formation)):
+                if wanted is None:
+                    filters.append((self._columns[field], None))
+                elif wanted in self._value_ids:
+                    filters.append((self._columns[field], self._value_ids[wanted]))
+                else:
+                    return []
+            (status_column, status_id), (formation_column, formation_id) = filters
+
+            groups = {term: self._groups(term) for term in set(terms)}
+            # Drive the scan with the most selective term
+            driver = min(groups, key=lambda term: sum(end - start for _, start, end, _ in groups[term]))
+            others = [term for term in groups if term != driver]
+            others_max = 0
+            for term in others:
+                if not groups[term]:
+                    return []
+                others_max += groups[term][0][0]
+
+            live = self._live
+            top = []
+            seen = set()
+            order = 0
+            for weight, start, end, code in groups[driver]:
+                bound = weight + others_max
+                if len(top) == limit and top[0][0] >= bound:
+                    break
+                for slot in self._slots[code][start:end]:
+                    if slot in seen:
+                        continue
+                    seen.add(slot)
+                    if not live[slot]:
+                        continue
+                    if status_id is not None and status_column[slot] != status_id:
+                        continue
+                    if formation_id is not None and formation_column[slot] != formation_id:
+                        continue
+
+                    score = weight
+                    for term in others:
+                        term_weight = self._best_weight(slot, term)
+                        if not term_weight:
+                            break
+                        score += term_weight
+                    else:
+                        order += 1
+                        if len(top) < limit:
+                            heapq.heappush(top, (score, -order, slot))
+                        elif score > top[0][0]:
+                            heapq.heapreplace(top, (score, -order, slot))
+                        if len(top) == limit and top[0][0] >= bound:
+                            break
+
+            return [self._result(slot, score) for score, _, slot in sorted(top, reverse=True)]
+
+    def _groups(self, term):
+        """
+        (weight, start, end, field code) posting ranges matching `term`,
+        heaviest first: per field, the exact-token range then the longer
+        tokens that start with it
+        """
+        groups = []
+        for code, field in enumerate(INDEXED_FIELDS):
+            tokens = self._tokens[code]
+            start = bisect_left(tokens, term)
+            exact_end = bisect_right(tokens, term, start)
+            end = bisect_left(tokens, term + "\uffff", exact_end)
+            weight = FIELD_WEIGHTS[field]
+            if exact_end > start:
+                groups.append((weight * 2, start, exact_end, code))
+            if end > exact_end:
+                groups.append((weight, exact_end, end, code))
+        groups.sort(key=lambda group: -group[0])
+        return groups
+
+    def _best_weight(self, slot, term):
+        best = 0
+        for field in INDEXED_FIELDS:
+            value = self._value(field, slot)
+            for token in _field_tokens(field, value):
+                if token.startswith(term):
+                    weight = FIELD_WEIGHTS[field] * (2 if token == term else 1)
+                    if weight > best:
+                        best = weight
+        return best
+
+    def _value(self, field, slot):
+        if field == UNIQUE_FIELD:
+            return self._service_numbers[slot]
+        return self._values[self._columns[field][slot]]
+
+    def _result(self, slot, score):
+        result = {field: self._value(field, slot) for field in COLUMNS}
+        result["_id"] = str(ObjectId(bytes(self._oids[slot * OID_SIZE:(slot + 1) * OID_SIZE])))
+        result["score"] = score
+        return result
+
+
+staff_index = StaffIndex()
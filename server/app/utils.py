@@ -1,5 +1,6 @@
 from datetime import datetime
 from bson import ObjectId
+from pymongo.errors import OperationFailure
 
 def serialize_doc(doc):
     """
@@ -22,3 +23,47 @@ def serialize_list(docs):
     Serialize list of MongoDB documents.
     """
     return [serialize_doc(doc) for doc in docs]
+
+
+MONTHS = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December",
+]
+
+
+def period_key(month, year):
+    """
+    Build a sortable "YYYY-MM" period key from a payroll month/year.
+    Month may be a name ("January") or a number (1-12).
+    """
+    if isinstance(month, str) and not month.isdigit():
+        month_number = MONTHS.index(month.capitalize()) + 1
+    else:
+        month_number = int(month)
+    if not 1 <= month_number <= 12:
+        raise ValueError(f"Invalid month: {month}")
+    return f"{int(year):04d}-{month_number:02d}"
+
+
+def add_months(period, count):
+    """
+    Shift a "YYYY-MM" period key forward by `count` months.
+    """
+    year, month = (int(part) for part in period.split("-"))
+    index = year * 12 + (month - 1) + count
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
+
+
+def run_in_transaction(client, callback):
+    """
+    Run `callback(session)` inside a multi-document transaction. Standalone
+    servers cannot run transactions, so there the callback runs without one.
+    """
+    with client.start_session() as session:
+        try:
+            return session.with_transaction(callback)
+        except OperationFailure as e:
+            # 20 = IllegalOperation: transactions need a replica set or mongos
+            if e.code != 20:
+                raise
+    return callback(None)